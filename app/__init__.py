@@ -3,21 +3,32 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import Config
+from app.cache import ResponseCache
+from app.engine import configure_engine
 
 db = SQLAlchemy()
 migrate = Migrate()
 login = LoginManager()
 login.login_view = 'routes.login'
+response_cache = ResponseCache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     db.init_app(app)
+    configure_engine(app, db)
     migrate.init_app(app, db)
     login.init_app(app)
+    response_cache.init_app(app)
     
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
+
+    from app.images import bp as images_bp
+    app.register_blueprint(images_bp)
+
+    from app.export import bp as export_bp
+    app.register_blueprint(export_bp)
     
     return app
\ No newline at end of file
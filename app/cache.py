@@ -0,0 +1,135 @@
+from datetime import datetime
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, make_response, request, session
+from flask_login import current_user
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# --- Data version counter ---
+# The pages we cache only change when a pipeline run commits, so the pipeline
+# bumps a counter stored in a small file. It lives on disk rather than in the
+# DB so web workers and the scheduler process all see it without a query.
+# The version is the file's size: a bump appends one byte with O_APPEND,
+# which is atomic, so concurrent bumps from several processes never collapse
+# into one the way a read-increment-write would.
+
+def _version_file():
+    try:
+        return current_app.config['DATA_VERSION_FILE']
+    except (RuntimeError, KeyError):
+        return Config.DATA_VERSION_FILE
+
+
+def get_data_version():
+    try:
+        return os.stat(_version_file()).st_size
+    except OSError:
+        return 0
+
+
+def bump_data_version():
+    """Increment the data version; call after committing new content."""
+    path = _version_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b'.')
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.error("Failed to bump data version at %s: %s", path, e)
+        return get_data_version()
+
+
+# --- In-process LRU of rendered responses ---
+
+class ResponseCache:
+    """
+    Small thread-safe LRU of rendered bodies keyed by
+    (endpoint, full path, user id, data version, UTC date).
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = 128
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RESPONSE_CACHE_SIZE', 128)
+        app.extensions['response_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _build_response(entry, cache_status):
+    body, mimetype, etag = entry
+    resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    # Pages are per-user, so browsers may keep them but must revalidate
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.headers['X-Cache'] = cache_status
+    return resp.make_conditional(request)
+
+
+def cached_view(view):
+    """
+    Serve a view from the response cache, with a strong ETag so repeat
+    requests get a 304. Entries are invalidated by bump_data_version(), and
+    at midnight UTC, since the cached views filter on the current week or
+    the last four weeks.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        # Pending flash messages are rendered into the page; never cache those
+        if cache is None or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        key = (request.endpoint, request.full_path, current_user.get_id(), get_data_version(),
+               datetime.utcnow().date())
+        entry = cache.get(key)
+        if entry is not None:
+            return _build_response(entry, 'HIT')
+
+        resp = make_response(view(*args, **kwargs))
+        if resp.status_code != 200 or resp.is_streamed:
+            return resp
+
+        body = resp.get_data()
+        entry = (body, resp.mimetype, hashlib.sha1(body).hexdigest())
+        cache.set(key, entry)
+        return _build_response(entry, 'MISS')
+    return wrapper
@@ -0,0 +1,38 @@
+import logging
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def configure_engine(app, db):
+    """
+    Per-connection tuning for the app's engine. On SQLite this applies
+    SQLITE_PRAGMAS (WAL, synchronous=NORMAL, busy_timeout, ...) so web
+    requests can keep reading while the pipeline thread commits.
+    """
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite':
+            return
+
+        pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+        if not pragmas:
+            return
+        if engine.url.database in (None, '', ':memory:') and 'journal_mode' in pragmas:
+            # WAL needs a file; in-memory databases only support MEMORY/OFF
+            pragmas = {k: v for k, v in pragmas.items() if k != 'journal_mode'}
+
+        event.listen(engine, 'connect', _apply_sqlite_pragmas(pragmas))
+        logger.debug("Applying SQLite pragmas on connect: %s", pragmas)
@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_login import current_user
+from sqlalchemy import select
+
+from app import db
+from app.models import NewsItem, SocialMediaScript, UnifiedScript
+
+# Bulk export for downstream tools. Rows are streamed straight off a
+# yield_per cursor (a server-side cursor where the driver supports one) and
+# encoded in fixed-size chunks, so memory stays flat however many rows match.
+bp = Blueprint('export', __name__)
+
+CHUNK_BYTES = 64 * 1024
+
+# dataset -> (columns, timestamp column for since/until, category column)
+DATASETS = {
+    'news': (
+        [NewsItem.id, NewsItem.title, NewsItem.link, NewsItem.summary, NewsItem.published,
+         NewsItem.category, NewsItem.image_path, NewsItem.image_variants, NewsItem.created_at],
+        NewsItem.created_at,
+        NewsItem.category,
+    ),
+    'scripts': (
+        [SocialMediaScript.id, SocialMediaScript.news_item_id, NewsItem.title.label('news_title'),
+         NewsItem.link.label('news_link'), SocialMediaScript.content, SocialMediaScript.created_at],
+        SocialMediaScript.created_at,
+        NewsItem.category,
+    ),
+    'unified-scripts': (
+        [UnifiedScript.id, UnifiedScript.content, UnifiedScript.week_start, UnifiedScript.created_at],
+        UnifiedScript.week_start,
+        None,
+    ),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _authorized():
+    """A logged-in user, or the EXPORT_TOKEN bearer token when one is configured."""
+    token = current_app.config.get('EXPORT_TOKEN')
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return current_user.is_authenticated
+
+
+def _parse_bound(value, end=False):
+    """ISO date or datetime; a bare date as `until` covers that whole day."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _build_query(dataset, since, until, category):
+    columns, time_column, category_column = DATASETS[dataset]
+    query = select(*columns)
+    if dataset == 'scripts':
+        query = query.outerjoin(NewsItem, SocialMediaScript.news_item_id == NewsItem.id)
+    if since:
+        query = query.where(time_column >= since)
+    if until:
+        query = query.where(time_column < until)
+    if category:
+        query = query.where(category_column == category)
+    return query.order_by(columns[0])
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(keys, rows):
+    for row in rows:
+        yield json.dumps({key: _plain(value) for key, value in zip(keys, row)}, ensure_ascii=False) + '\n'
+
+
+def _encode_csv(keys, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(keys)
+    for row in rows:
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (list, dict)) else _plain(value)
+            for value in row
+        ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _chunked(pieces):
+    """Join small encoded pieces into CHUNK_BYTES-sized writes."""
+    parts, size = [], 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@bp.route('/api/export/<dataset>')
+def export(dataset):
+    """
+    Stream a dataset as NDJSON (default) or CSV.
+    Query params: format=ndjson|csv, since/until (ISO date or datetime,
+    until exclusive; a bare date includes that day), category.
+    The body is gzipped when the client sends Accept-Encoding: gzip.
+    """
+    if not _authorized():
+        return jsonify({'status': 'error', 'message': 'Authentication required'}), 401
+    if dataset not in DATASETS:
+        return jsonify({'status': 'error', 'message': f'Unknown dataset {dataset!r}',
+                        'datasets': sorted(DATASETS)}), 404
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'status': 'error', 'message': f'Unknown format {fmt!r}',
+                        'formats': sorted(FORMATS)}), 400
+    try:
+        since = _parse_bound(request.args['since']) if request.args.get('since') else None
+        until = _parse_bound(request.args['until'], end=True) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since/until must be ISO dates or datetimes'}), 400
+    category = request.args.get('category')
+    if category and DATASETS[dataset][2] is None:
+        return jsonify({'status': 'error', 'message': f'{dataset} has no category'}), 400
+
+    query = _build_query(dataset, since, until, category).execution_options(
+        yield_per=current_app.config['EXPORT_BATCH_SIZE']
+    )
+
+    def generate():
+        result = db.session.execute(query)
+        try:
+            encode = _encode_csv if fmt == 'csv' else _encode_ndjson
+            yield from _chunked(encode(list(result.keys()), result))
+        finally:
+            result.close()
+            db.session.rollback()
+
+    gzip_body = 'gzip' in request.accept_encodings
+    body = _gzipped(generate()) if gzip_body else generate()
+
+    resp = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    if gzip_body:
+        resp.headers['Content-Encoding'] = 'gzip'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'private, no-store'
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
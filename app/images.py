@@ -0,0 +1,37 @@
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, make_response, send_from_directory
+from werkzeug.security import safe_join
+
+# Serves downloaded news images. Filenames are content hashes (see
+# download_image), so a URL always points at the same bytes and can be
+# cached forever by browsers and CDNs.
+bp = Blueprint('images', __name__)
+
+IMMUTABLE_MAX_AGE = 31536000  # one year
+
+
+@bp.route('/images/<path:filename>')
+def image(filename):
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    path = safe_join(upload_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    accel_prefix = current_app.config.get('IMAGE_X_ACCEL_PREFIX')
+    if accel_prefix:
+        # nginx serves the bytes (including range/conditional handling) from
+        # an internal location mapped onto UPLOAD_FOLDER
+        resp = make_response('')
+        resp.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        resp.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        # send_from_directory handles Range and If-None-Match/If-Modified-Since,
+        # and hands off to the proxy with X-Sendfile when USE_X_SENDFILE is set
+        resp = send_from_directory(upload_folder, filename, conditional=True,
+                                   max_age=IMMUTABLE_MAX_AGE)
+
+    resp.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return resp
+
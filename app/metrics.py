@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from app import db
+from app.cache import bump_data_version
+from app.models import PipelineRun
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'newsagg'
+
+# ---------------------------
+# Process-local registry
+# ---------------------------
+# Stage timings and event counters for this process, keyed by
+# (name, sorted label items). A pipeline run started with pipeline_run()
+# also aggregates the same observations and saves them as a PipelineRun row,
+# so runs executed in the scheduler process are visible from the web app.
+# Job workers have no run of their own: the counters a job increments are
+# captured and returned with its result, and the run that queued the job
+# adds them with add_to_run().
+
+_lock = threading.Lock()
+_timings = {}   # (stage, labels) -> [count, total_seconds, max_seconds]
+_counters = {}  # (name, labels) -> value
+_active_run = None
+_local = threading.local()  # .counts: counters being captured on this thread
+
+
+class _RunRecorder:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    def observe(self, stage, labels, seconds):
+        entry = self.stages.setdefault(stage, {'count': 0, 'seconds': 0.0, 'max': 0.0})
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+        if labels:
+            # Keep a per-label breakdown (per feed, per Gemini call, ...)
+            key = str(labels[0][1])
+            by = entry.setdefault('by', {})
+            by[key] = by.get(key, 0.0) + seconds
+
+    def incr(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(stage, seconds, **labels):
+    key = _key(stage, labels)
+    with _lock:
+        entry = _timings.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        if _active_run is not None:
+            _active_run.observe(stage, key[1], seconds)
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Time the enclosed block as one observation of `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, **labels)
+
+
+def incr(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        if _active_run is not None:
+            _active_run.incr(name, value)
+    counts = getattr(_local, 'counts', None)
+    if counts is not None:
+        counts[name] = counts.get(name, 0) + value
+
+
+@contextmanager
+def captured():
+    """Also collect the counters incremented on this thread in the block; yields {name: value}."""
+    counts = {}
+    previous = getattr(_local, 'counts', None)
+    _local.counts = counts
+    try:
+        yield counts
+    finally:
+        _local.counts = previous
+
+
+def run_active():
+    return _active_run is not None
+
+
+def add_to_run(counters):
+    """Add counters recorded in another process (a job worker) to the active run only."""
+    with _lock:
+        if _active_run is not None:
+            for name, value in counters.items():
+                _active_run.incr(name, value)
+
+
+def reset():
+    """Clear the process-local registry (used by benchmarks)."""
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+@contextmanager
+def pipeline_run():
+    """
+    Record one pipeline run (fetch through Telegram) as a PipelineRun row.
+    Runs under an app context. Yields the recorder so callers can read totals.
+    """
+    global _active_run
+
+    recorder = _RunRecorder()
+    run = PipelineRun(started_at=datetime.utcnow(), status='running')
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.id
+
+    with _lock:
+        _active_run = recorder
+    start = time.perf_counter()
+    status = 'failed'
+    try:
+        yield recorder
+        status = 'success'
+    finally:
+        with _lock:
+            _active_run = None
+        try:
+            if status != 'success':
+                db.session.rollback()
+            run = db.session.get(PipelineRun, run_id)
+            run.finished_at = datetime.utcnow()
+            run.duration = time.perf_counter() - start
+            run.status = status
+            run.items = recorder.counters.get('news_items_saved', 0)
+            run.stages = recorder.stages
+            run.counters = recorder.counters
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Failed to save pipeline run metrics: %s", e)
+        # Cached /api/status responses report the latest run
+        bump_data_version()
+
+
+# ---------------------------
+# Prometheus text exposition
+# ---------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def render_prometheus():
+    """Prometheus text format (0.0.4) for this process plus the latest stored run."""
+    lines = []
+    with _lock:
+        timings = sorted(_timings.items())
+        counters = sorted(_counters.items())
+
+    name = f'{METRIC_PREFIX}_stage_seconds'
+    lines.append(f'# HELP {name} Time spent in pipeline stages by this process.')
+    lines.append(f'# TYPE {name} summary')
+    for (stage, labels), (count, total, _) in timings:
+        series = _fmt_labels((('stage', stage),) + labels)
+        lines.append(f'{name}_count{series} {count}')
+        lines.append(f'{name}_sum{series} {total:.6f}')
+
+    name = f'{METRIC_PREFIX}_stage_max_seconds'
+    lines.append(f'# HELP {name} Slowest single observation of each pipeline stage by this process.')
+    lines.append(f'# TYPE {name} gauge')
+    for (stage, labels), (_, _, longest) in timings:
+        lines.append(f'{name}{_fmt_labels((("stage", stage),) + labels)} {longest:.6f}')
+
+    name = f'{METRIC_PREFIX}_events_total'
+    lines.append(f'# HELP {name} Pipeline events counted by this process.')
+    lines.append(f'# TYPE {name} counter')
+    for (event, labels), value in counters:
+        lines.append(f'{name}{_fmt_labels((("event", event),) + labels)} {value}')
+
+    # Runs may happen in the scheduler process, so report them from the DB
+    name = f'{METRIC_PREFIX}_pipeline_runs'
+    lines.append(f'# HELP {name} Stored pipeline runs by status.')
+    lines.append(f'# TYPE {name} gauge')
+    for status, count in db.session.query(
+        PipelineRun.status, db.func.count(PipelineRun.id)
+    ).group_by(PipelineRun.status):
+        lines.append(f'{name}{_fmt_labels((("status", status),))} {count}')
+
+    last = PipelineRun.query.filter(
+        PipelineRun.finished_at.isnot(None)
+    ).order_by(PipelineRun.finished_at.desc()).first()
+    if last is not None:
+        prefix = f'{METRIC_PREFIX}_last_run'
+        lines.append(f'# HELP {prefix}_timestamp_seconds Finish time of the latest pipeline run.')
+        lines.append(f'# TYPE {prefix}_timestamp_seconds gauge')
+        lines.append(f'{prefix}_timestamp_seconds {(last.finished_at - datetime(1970, 1, 1)).total_seconds():.0f}')
+        lines.append(f'# HELP {prefix}_duration_seconds Wall time of the latest pipeline run.')
+        lines.append(f'# TYPE {prefix}_duration_seconds gauge')
+        lines.append(f'{prefix}_duration_seconds {last.duration or 0:.6f}')
+        lines.append(f'# HELP {prefix}_items News items saved by the latest pipeline run.')
+        lines.append(f'# TYPE {prefix}_items gauge')
+        lines.append(f'{prefix}_items {last.items or 0}')
+        lines.append(f'# HELP {prefix}_success Whether the latest pipeline run succeeded.')
+        lines.append(f'# TYPE {prefix}_success gauge')
+        lines.append(f'{prefix}_success {1 if last.status == "success" else 0}')
+        lines.append(f'# HELP {prefix}_stage_seconds Time per stage in the latest pipeline run.')
+        lines.append(f'# TYPE {prefix}_stage_seconds gauge')
+        for stage, entry in sorted((last.stages or {}).items()):
+            lines.append(f'{prefix}_stage_seconds{_fmt_labels((("stage", stage),))} {entry["seconds"]:.6f}')
+        counters = last.counters or {}
+        lookups = sum(counters.get(k, 0) for k in ('http_cache_hits', 'http_cache_revalidated', 'http_cache_misses'))
+        if lookups:
+            served = counters.get('http_cache_hits', 0) + counters.get('http_cache_revalidated', 0)
+            lines.append(f'# HELP {prefix}_http_cache_hit_ratio Article/image requests in the latest run answered from the HTTP cache.')
+            lines.append(f'# TYPE {prefix}_http_cache_hit_ratio gauge')
+            lines.append(f'{prefix}_http_cache_hit_ratio {served / lookups:.4f}')
+
+    return '\n'.join(lines) + '\n'
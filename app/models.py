@@ -23,7 +23,18 @@ class NewsItem(db.Model):
     published = db.Column(db.DateTime, index=True)
     category = db.Column(db.String(100))
     image_path = db.Column(db.String(500))
+    # Downscaled copies of image_path: [{"file", "width", "format"}, ...]
+    image_variants = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Backs the keyset pagination on (created_at, id) used by index/dashboard
+    __table_args__ = (
+        db.Index('ix_news_item_created_at_id', 'created_at', 'id'),
+    )
+
+    def variant_srcset(self, fmt):
+        """Files and widths of the image variants in one format, smallest first."""
+        return [v for v in (self.image_variants or []) if v.get('format') == fmt]
     
 class SocialMediaScript(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -40,6 +51,91 @@ class UnifiedScript(db.Model):
     week_start = db.Column(db.DateTime, nullable=False)  # Start of the week this script covers
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class FeedState(db.Model):
+    """Adaptive polling state for one RSS feed (see scripts/feed_poller.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), unique=True, nullable=False)
+    etag = db.Column(db.String(255))
+    modified = db.Column(db.String(255))
+    publish_interval = db.Column(db.Integer)  # learned seconds between entries
+    poll_interval = db.Column(db.Integer)  # seconds until the next poll
+    next_poll_at = db.Column(db.DateTime, index=True)
+    last_polled_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(20))
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+    unchanged_count = db.Column(db.Integer, default=0, nullable=False)
+
+class FeedEntry(db.Model):
+    """Staging row for a polled feed entry; the weekly digest reads from here."""
+    id = db.Column(db.Integer, primary_key=True)
+    feed_url = db.Column(db.String(500), nullable=False, index=True)
+    title = db.Column(db.String(500), nullable=False)
+    link = db.Column(db.String(500), unique=True, nullable=False)
+    summary = db.Column(db.Text)
+    published = db.Column(db.DateTime, index=True)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class PipelineRun(db.Model):
+    """Timings and counters recorded for one pipeline run (see app/metrics.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, index=True)
+    duration = db.Column(db.Float)  # seconds
+    status = db.Column(db.String(20), nullable=False, default='running')
+    items = db.Column(db.Integer)
+    stages = db.Column(db.JSON)  # {stage: {"count", "seconds", "max", "by"?}}
+    counters = db.Column(db.JSON)  # {event: total}
+
+class HostPolicy(db.Model):
+    """Crawl policy for one host: cached robots.txt and error history (see scripts/crawl_policy.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    host = db.Column(db.String(255), unique=True, nullable=False)
+    robots_txt = db.Column(db.Text)
+    robots_status = db.Column(db.Integer)  # HTTP status of the robots.txt fetch, 0 if unreachable
+    robots_expires_at = db.Column(db.DateTime)
+    crawl_delay = db.Column(db.Float)  # seconds, from robots.txt
+    request_count = db.Column(db.Integer, default=0, nullable=False)
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+    error_rate = db.Column(db.Float, default=0.0, nullable=False)  # moving average in [0, 1]
+    last_request_at = db.Column(db.DateTime)
+    # Circuit breaker: closed, open (fail fast until breaker_until) or half_open
+    breaker_state = db.Column(db.String(20), default='closed', nullable=False)
+    consecutive_failures = db.Column(db.Integer, default=0, nullable=False)
+    breaker_until = db.Column(db.DateTime)
+    # Next free request slot, reserved by job workers so they share one pace per host
+    next_request_at = db.Column(db.DateTime)
+
+class ImageMiss(db.Model):
+    """Negative cache entry: an article URL where no usable image was found."""
+    id = db.Column(db.Integer, primary_key=True)
+    link = db.Column(db.String(500), unique=True, nullable=False)
+    reason = db.Column(db.String(40))
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Job(db.Model):
+    """Queued unit of pipeline work (fetch, scrape, image, script), see scripts/job_queue.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    batch = db.Column(db.String(32), index=True)  # the pipeline run that queued it
+    payload = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Lease held by the claiming worker; once it expires the job can be claimed again
+    lease_owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Claim query: runnable jobs in id order
+        db.Index('ix_job_status_available_at', 'status', 'available_at'),
+    )
+
 @login.user_loader
 def load_user(id):
     return User.query.get(int(id))
\ No newline at end of file
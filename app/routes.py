@@ -1,52 +1,139 @@
-from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify, current_app
+from flask import Blueprint, Response, render_template, flash, redirect, url_for, request, jsonify, current_app
 from flask_login import current_user, login_user, logout_user, login_required
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import selectinload
 from app import db
-from app.models import User, NewsItem, SocialMediaScript, UnifiedScript
-from datetime import datetime, timedelta
+from app.cache import cached_view
+from app.metrics import pipeline_run, render_prometheus
+from app.models import User, NewsItem, SocialMediaScript, UnifiedScript, PipelineRun
+from datetime import datetime, date, timedelta
+import base64
+import binascii
 import threading
 import logging
 
-# Import your custom scripts
-from scripts.news_scraper import run_news_pipeline
-from scripts.telegram_bot import send_weekly_digest
+# The pipeline (Gemini client, bs4, Pillow, feed parsing) is imported inside
+# trigger_news, so web workers don't load it until someone retrieves news.
 
 # Define the blueprint
 bp = Blueprint('routes', __name__)
 
+# --- Keyset pagination helpers ---
+# Pages are ordered by (created_at, id) descending and backed by the
+# ix_news_item_created_at_id index, so fetching page N costs the same as page 1.
+
+def _encode_cursor(item):
+    raw = f"{item.created_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """Returns (created_at, id) or None if the cursor is missing/malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, item_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+def _keyset_page(query, cursor, per_page):
+    """
+    Apply the (created_at, id) keyset to a query whose first entity is NewsItem.
+    Returns (rows, has_more).
+    """
+    if cursor:
+        query = query.filter(tuple_(NewsItem.created_at, NewsItem.id) < tuple_(*cursor))
+    rows = query.order_by(
+        NewsItem.created_at.desc(), NewsItem.id.desc()
+    ).limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+def _week_bucket(column):
+    """SQL expression for the Monday that starts the week containing `column`."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.date_trunc('week', column)
+    if dialect == 'mysql':
+        return func.subdate(func.date(column), func.weekday(column))
+    # SQLite: step back six days, then forward to the next Monday. Date
+    # modifiers work at millisecond precision, so the last instant of a
+    # Sunday would round into Monday; truncate to the day first.
+    return func.date(func.date(column), '-6 days', 'weekday 1')
+
+def _as_date(value):
+    # SQLite hands date() results back as 'YYYY-MM-DD' strings
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def _current_week_start():
+    # start of this week (UTC) as a datetime at 00:00
+    today = datetime.utcnow().date()
+    week_start_date = today - timedelta(days=today.weekday())
+    return datetime.combine(week_start_date, datetime.min.time())
+
 @bp.route('/')
 @bp.route('/index')
 @login_required
+@cached_view
 def index():
-    # start of this week (UTC) as a datetime at 00:00
-    today = datetime.utcnow().date()
-    week_start_date = today - timedelta(days=today.weekday())
-    week_start_dt = datetime.combine(week_start_date, datetime.min.time())
+    week_start_dt = _current_week_start()
+    per_page = current_app.config['NEWS_PAGE_SIZE']
+    cursor = _decode_cursor(request.args.get('cursor'))
 
-    news_items = NewsItem.query.filter(
+    query = NewsItem.query.options(selectinload(NewsItem.scripts)).filter(
         NewsItem.created_at >= week_start_dt
-    ).order_by(NewsItem.created_at.desc()).all()
+    )
+    news_items, has_more = _keyset_page(query, cursor, per_page)
+    next_cursor = _encode_cursor(news_items[-1]) if has_more else None
+
+    last_updated = db.session.query(func.max(NewsItem.created_at)).filter(
+        NewsItem.created_at >= week_start_dt
+    ).scalar()
 
     unified_script = UnifiedScript.query.filter(
         UnifiedScript.week_start >= week_start_dt
     ).order_by(UnifiedScript.created_at.desc()).first()
 
     return render_template('index.html', title='Home',
-                           news_items=news_items, unified_script=unified_script)
+                           news_items=news_items, unified_script=unified_script,
+                           last_updated=last_updated, cursor=cursor,
+                           next_cursor=next_cursor)
 
 @bp.route('/dashboard')
 @login_required
+@cached_view
 def dashboard():
     four_weeks_ago_dt = datetime.utcnow() - timedelta(weeks=4)
-    news_items = NewsItem.query.filter(
-        NewsItem.created_at >= four_weeks_ago_dt
-    ).order_by(NewsItem.created_at.desc()).all()
-
+    per_page = current_app.config['NEWS_PAGE_SIZE']
+    cursor = _decode_cursor(request.args.get('cursor'))
+    week_start = _week_bucket(NewsItem.created_at).label('week_start')
+
+    query = db.session.query(NewsItem, week_start).options(
+        selectinload(NewsItem.scripts)
+    ).filter(NewsItem.created_at >= four_weeks_ago_dt)
+    rows, has_more = _keyset_page(query, cursor, per_page)
+    next_cursor = _encode_cursor(rows[-1][0]) if has_more else None
+
+    # Per-week totals come straight from a GROUP BY so they cover every page
+    week_counts = {
+        _as_date(week).isocalendar()[1]: count
+        for week, count in db.session.query(week_start, func.count(NewsItem.id))
+        .filter(NewsItem.created_at >= four_weeks_ago_dt)
+        .group_by(week_start)
+        .all()
+    }
+
+    # Rows arrive newest first, so each week's items are already contiguous
     weekly_news = {}
-    for item in news_items:
-        week = item.created_at.isocalendar()[1]
-        weekly_news.setdefault(week, []).append(item)
+    for item, week in rows:
+        weekly_news.setdefault(_as_date(week).isocalendar()[1], []).append(item)
 
-    return render_template('dashboard.html', title='Dashboard', weekly_news=weekly_news)
+    return render_template('dashboard.html', title='Dashboard', weekly_news=weekly_news,
+                           week_counts=week_counts, cursor=cursor, next_cursor=next_cursor)
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -78,17 +165,21 @@ def trigger_news():
     # Get the application instance
     app = current_app._get_current_object()
     
+    from scripts.news_scraper import run_news_pipeline
+    from scripts.telegram_bot import send_weekly_digest
+
     def run_pipeline():
         # Create a new application context for the thread
         with app.app_context():
             try:
                 current_app.logger.info("Starting news pipeline in background thread")
-                news_dicts = run_news_pipeline()
-                if news_dicts:
-                    current_app.logger.info(f"Pipeline completed, found {len(news_dicts)} news items")
-                    send_weekly_digest(news_dicts)
-                else:
-                    current_app.logger.info("Pipeline completed but no news items found")
+                with pipeline_run():
+                    news_dicts = run_news_pipeline()
+                    if news_dicts:
+                        current_app.logger.info(f"Pipeline completed, found {len(news_dicts)} news items")
+                        send_weekly_digest(news_dicts)
+                    else:
+                        current_app.logger.info("Pipeline completed but no news items found")
             except Exception as e:
                 current_app.logger.error(f"Error in news pipeline: {str(e)}")
 
@@ -96,13 +187,12 @@ def trigger_news():
     thread.daemon = True
     thread.start()
 
-    return jsonify({'status': 'success', 'message': 'News retrieval started in the background. All old content has been cleared.'})
+    return jsonify({'status': 'success', 'message': 'News retrieval started in the background.'})
 @bp.route('/api/status')
 @login_required
+@cached_view
 def api_status():
-    today = datetime.utcnow().date()
-    week_start_date = today - timedelta(days=today.weekday())
-    week_start_dt = datetime.combine(week_start_date, datetime.min.time())
+    week_start_dt = _current_week_start()
 
     news_count = NewsItem.query.filter(
         NewsItem.created_at >= week_start_dt
@@ -112,7 +202,24 @@ def api_status():
         UnifiedScript.week_start >= week_start_dt
     ).first() is not None
 
+    # The page's "Retrieve News" poll waits for this to change (runs bump the data version when they finish)
+    last_run = PipelineRun.query.order_by(PipelineRun.id.desc()).first()
+
     return jsonify({
         'news_count': news_count,
-        'has_unified_script': has_unified_script
+        'has_unified_script': has_unified_script,
+        'last_run': {
+            'id': last_run.id,
+            'status': last_run.status,
+            'finished_at': last_run.finished_at.isoformat() if last_run.finished_at else None,
+        } if last_run else None
     })
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: logged-in users, or the METRICS_TOKEN bearer token when one is configured."""
+    token = current_app.config.get('METRICS_TOKEN')
+    scraper = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not scraper and not current_user.is_authenticated:
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
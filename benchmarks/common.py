@@ -0,0 +1,44 @@
+"""Shared setup for the benchmark scripts."""
+import os
+import resource
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def configure_for_stubs(stub, workdir, feeds):
+    """
+    Point Config at the stub server and a throwaway DB/image folder. The
+    pipeline reads Config directly, so call this before create_app().
+    """
+    from config import Config
+
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    Config.UPLOAD_FOLDER = os.path.join(workdir, 'images')
+    Config.DATA_VERSION_FILE = os.path.join(workdir, 'data_version')
+    Config.HTTP_CACHE_FOLDER = os.path.join(workdir, 'http_cache')
+    Config.RSS_FEEDS = stub.feed_urls(feeds)
+    Config.FEED_POLL_DELAY = 0
+    # One stub host stands in for every outlet, so per-host pacing would serialize the whole run
+    Config.CRAWL_DEFAULT_DELAY = 0
+    Config.TELEGRAM_API_URL = stub.base_url
+    Config.TELEGRAM_BOT_TOKEN = 'bench'
+    Config.TELEGRAM_CHAT_ID = 'bench'
+    return Config
@@ -0,0 +1,153 @@
+"""
+Dashboard latency while a pipeline run is writing to the same SQLite DB.
+
+    python -m benchmarks.concurrent_dashboard --feeds 200
+    python -m benchmarks.concurrent_dashboard --feeds 200 --no-pragmas
+
+The pipeline runs in a background thread against the local stubs (as
+/trigger-news does) while the main thread requests /dashboard in a loop.
+Reports dashboard latency percentiles during the run, failed requests
+("database is locked" and friends) and the pipeline's wall time as JSON.
+--no-pragmas disables SQLITE_PRAGMAS for a before/after comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import configure_for_stubs, git_commit
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def _seed_history(db, rows):
+    """Fill four weeks of NewsItem history so the dashboard has real work to do."""
+    from app.models import NewsItem, SocialMediaScript, User
+
+    user = User(username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    now = datetime.utcnow()
+    for i in range(rows):
+        item = NewsItem(title=f'History item {i}', link=f'https://example.com/history/{i}',
+                        summary='Seeded history row for the dashboard benchmark. ' * 4,
+                        category='education',
+                        created_at=now - timedelta(minutes=i * 40320 // max(rows, 1)))
+        db.session.add(item)
+        db.session.add(SocialMediaScript(content='seed', news_item=item))
+    db.session.commit()
+
+
+def run(args):
+    from benchmarks.stubs import StubServer, StubSettings, FakeGemini
+
+    workdir = tempfile.mkdtemp(prefix='newsagg-bench-')
+    stub = StubServer(StubSettings(latency_ms=args.latency_ms)).start()
+    config = configure_for_stubs(stub, workdir, args.feeds)
+    # Measure the DB, not the response cache
+    config.RESPONSE_CACHE_SIZE = 0
+    if args.no_pragmas:
+        config.SQLITE_PRAGMAS = {}
+
+    from app import create_app, db
+    import scripts.news_scraper as news_scraper
+
+    news_scraper.genai = FakeGemini(latency_ms=args.gemini_latency_ms)
+    # Seeded history spans the retention window, so the run's retention pass
+    # archives its oldest rows while the dashboard is being read
+    config.ARCHIVE_FOLDER = os.path.join(workdir, 'archive')
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        _seed_history(db, args.history_rows)
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    pipeline_error = []
+    pipeline_time = []
+
+    def pipeline():
+        with app.app_context():
+            start = time.perf_counter()
+            try:
+                news_scraper.run_news_pipeline()
+            except Exception as e:
+                pipeline_error.append(repr(e))
+            pipeline_time.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=pipeline, daemon=True)
+    latencies = []
+    failures = {}
+    thread.start()
+    while thread.is_alive():
+        start = time.perf_counter()
+        try:
+            resp = client.get('/dashboard')
+            if resp.status_code != 200:
+                failures[str(resp.status_code)] = failures.get(str(resp.status_code), 0) + 1
+        except Exception as e:
+            key = type(e).__name__ + (': database is locked' if 'locked' in str(e) else '')
+            failures[key] = failures.get(key, 0) + 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(args.request_interval_ms / 1000.0)
+    thread.join()
+    stub.stop()
+
+    return {
+        'feeds': args.feeds,
+        'pragmas': not args.no_pragmas,
+        'history_rows': args.history_rows,
+        'pipeline_seconds': round(pipeline_time[0], 4) if pipeline_time else None,
+        'pipeline_error': pipeline_error[0] if pipeline_error else None,
+        'dashboard_requests': len(latencies),
+        'dashboard_failures': failures,
+        'dashboard_ms': {
+            'p50': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p95': round(_percentile(latencies, 95), 2) if latencies else None,
+            'p99': round(_percentile(latencies, 99), 2) if latencies else None,
+            'max': round(max(latencies), 2) if latencies else None,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, default=200)
+    parser.add_argument('--history-rows', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--gemini-latency-ms', type=float, default=500)
+    parser.add_argument('--request-interval-ms', type=float, default=10)
+    parser.add_argument('--no-pragmas', action='store_true', help='disable SQLITE_PRAGMAS')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'benchmark': 'concurrent_dashboard',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'result': run(args),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Memory and time of the in-memory entry representation used by the pipeline.
+
+    python -m benchmarks.entry_memory --entries 10000 100000
+
+Compares the previous 4-key dict entries (publish time kept as an ISO
+string and re-parsed by each filter) with FeedItem. For each size it builds
+the entries the way load_staged_entries() does, then runs the week/keyword
+filters and get_latest(). Reports tracemalloc's retained and peak bytes and
+the filter time (taken under tracemalloc, so only meaningful relative to
+the other representation) as JSON. Each representation runs in its own
+subprocess so one can't warm caches for the other.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import ROOT, git_commit
+
+
+def _rows(n):
+    """(title, link, summary, published) tuples shaped like FeedEntry rows."""
+    now = datetime.utcnow()
+    for i in range(n):
+        topic = 'students and teachers at the university' if i % 2 else 'the markets'
+        summary = (f'<p>Story {i} about {topic}. </p><img src="https://img.example.com/{i}.jpg"/>') * 3
+        yield (f'Story {i} on {topic}', f'https://news.example.com/{i % 997}/story-{i}.html?utm_source=rss',
+               summary, now - timedelta(minutes=7 * i))
+
+
+def _dict_pipeline(rows, keywords):
+    from dateutil import parser as date_parser
+
+    entries = [
+        {'title': title, 'link': link, 'published': published.isoformat(), 'summary': summary or ''}
+        for title, link, summary, published in rows
+    ]
+    retained = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    today = datetime.utcnow().date()
+    start_of_week = today - timedelta(days=today.weekday())
+    week = [e for e in entries if e.get('published') and date_parser.parse(e['published']).date() >= start_of_week]
+    edu = [e for e in week if any(k in (e['title'] + " " + e['summary']).lower() for k in keywords)]
+    latest = sorted(edu, key=lambda e: date_parser.parse(e['published']), reverse=True)[:10]
+    return entries, latest, retained, time.perf_counter() - start
+
+
+def _item_pipeline(rows, keywords):
+    from config import Config
+    from scripts.feed_reader import FeedItem
+    from scripts.news_scraper import dedupe_items, filter_education, filter_this_week, get_latest
+
+    entries = [FeedItem(title, link, summary, published) for title, link, summary, published in rows]
+    retained = tracemalloc.get_traced_memory()[0]
+
+    Config.EDUCATION_KEYWORDS = keywords
+    start = time.perf_counter()
+    latest = get_latest(filter_education(dedupe_items(filter_this_week(entries))), limit=10)
+    return entries, latest, retained, time.perf_counter() - start
+
+
+def run_single(kind, n):
+    keywords = ['education', 'school', 'students', 'teachers', 'university']
+    rows = list(_rows(n))
+    pipeline = _item_pipeline if kind == 'feeditem' else _dict_pipeline
+    if kind == 'feeditem':
+        # Import outside the traced region so module objects aren't counted
+        import scripts.news_scraper  # noqa: F401
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    entries, latest, retained, seconds = pipeline(rows, keywords)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'kind': kind,
+        'entries': n,
+        'retained_bytes': retained - baseline,
+        'bytes_per_entry': round((retained - baseline) / max(n, 1), 1),
+        'after_filters_bytes': current - baseline,
+        'peak_bytes': peak - baseline,
+        'filter_seconds': round(seconds, 4),
+        'selected': len(latest),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--single', choices=['dict', 'feeditem'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.entries[0])))
+        return 0
+
+    results = []
+    for n in args.entries:
+        for kind in ('dict', 'feeditem'):
+            print(f'Measuring {n} {kind} entries...', file=sys.stderr)
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.entry_memory', '--single', kind,
+                                  '--entries', str(n)], cwd=ROOT, check=True,
+                                 stdout=subprocess.PIPE, text=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    report = {
+        'benchmark': 'entry_memory',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
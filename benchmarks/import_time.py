@@ -0,0 +1,121 @@
+"""
+Import-time and baseline-memory report for the app's entry points.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules run --max-ms 1500
+
+Each module is imported in a fresh interpreter with `-X importtime`. The
+report gives the total import time, the slowest modules by self time and
+by cumulative time, and the process's peak RSS once the import finishes.
+
+It also works as a regression check. Web workers import `run` (which
+builds the app and its blueprints), so the pipeline's heavy dependencies
+must not appear in that import. If an entry point loads a module from
+HEAVY_MODULES that ENTRY_POINTS doesn't allow for it, or an import
+exceeds --max-ms, the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+
+from benchmarks.common import ROOT, git_commit
+
+# Loaded lazily by the pipeline; none of these should be imported at web-worker boot
+HEAVY_MODULES = ('google.generativeai', 'feedparser', 'bs4', 'PIL', 'apscheduler')
+
+# Entry points, and the heavy modules each is allowed to import
+ENTRY_POINTS = {
+    'run': (),
+    'app.routes': (),
+    'scheduler': ('apscheduler',),
+    'scripts.news_scraper': HEAVY_MODULES,
+}
+
+_CHILD = (
+    "import resource, sys; import {module}; "
+    "peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss; "
+    "print(peak // 1024 if sys.platform == 'darwin' else peak)"
+)
+
+
+def _parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each `-X importtime` line."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(module, top=10):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _CHILD.format(module=module)],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{proc.stderr[-2000:]}')
+    rows = _parse_importtime(proc.stderr)
+    total_us = next((cumulative for name, _, cumulative, _ in rows if name == module), 0)
+    loaded = {name for name, _, _, _ in rows}
+    heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+
+    return {
+        'module': module,
+        'import_ms': round(total_us / 1000.0, 1),
+        'modules_loaded': len(rows),
+        'peak_rss_kb': int(proc.stdout.strip().splitlines()[-1]),
+        'heavy_modules': heavy,
+        'slowest_self_ms': [
+            [name, round(self_us / 1000.0, 1)]
+            for name, self_us, _, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+        ],
+        'slowest_packages_ms': [
+            [name, round(cumulative / 1000.0, 1)]
+            for name, _, cumulative, depth in sorted(rows, key=lambda r: r[2], reverse=True)
+            if depth <= 2 and name != module
+        ][:top],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=list(ENTRY_POINTS),
+                        help='modules to import (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=10, help='modules listed per ranking')
+    parser.add_argument('--max-ms', type=float, help='fail if any import takes longer than this')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = [measure(module, args.top) for module in args.modules]
+    failures = []
+    for result in results:
+        allowed = ENTRY_POINTS.get(result['module'], HEAVY_MODULES)
+        unexpected = [m for m in result['heavy_modules'] if m not in allowed]
+        if unexpected:
+            failures.append(f"{result['module']} imports {', '.join(unexpected)}")
+        if args.max_ms is not None and result['import_ms'] > args.max_ms:
+            failures.append(f"{result['module']} took {result['import_ms']}ms (> {args.max_ms}ms)")
+
+    report = {
+        'benchmark': 'import_time',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'results': results,
+        'failures': failures,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Job queue scaling benchmark.
+
+    python -m benchmarks.queue_workers --feeds 200 --workers 0 1 2 4
+
+Runs run_news_pipeline() with JOB_QUEUE on against the local stubs, with
+N `run_worker` processes working the queue next to it (0 = the run works
+every job itself). Each worker count runs in a fresh subprocess with its own
+throwaway SQLite DB; wall time, jobs per worker and the per-stage breakdown
+are reported as JSON.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, configure_for_stubs, git_commit
+
+
+def _worker(stop, counts):
+    from app import create_app
+    from scripts.job_queue import run_worker
+
+    app = create_app()
+    with app.app_context():
+        counts.put(run_worker(stop=stop))
+
+
+def run_single(args):
+    from benchmarks.stubs import StubServer, StubSettings, FakeGemini
+
+    workdir = tempfile.mkdtemp(prefix='newsagg-queue-')
+    stub = StubServer(StubSettings(
+        latency_ms=args.latency_ms,
+        entries_per_feed=args.entries_per_feed,
+        article_kb=args.article_kb,
+        image_px=args.image_px,
+    )).start()
+    config = configure_for_stubs(stub, workdir, args.feeds)
+    config.JOB_QUEUE_ENABLED = True
+    config.JOB_POLL_INTERVAL = 0.05
+    config.JOB_FETCH_BATCH_SIZE = args.fetch_batch
+
+    from app import create_app, db, metrics
+    from app.metrics import pipeline_run
+    import scripts.news_scraper as news_scraper
+
+    # Workers import the pipeline themselves, so the fake model goes in before forking
+    gemini = FakeGemini(latency_ms=args.gemini_latency_ms)
+    news_scraper.genai = gemini
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()  # children open their own connections
+
+    ctx = multiprocessing.get_context('fork')
+    stop = ctx.Event()
+    counts = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(stop, counts)) for _ in range(args.workers)]
+    for proc in workers:
+        proc.start()
+
+    with app.app_context():
+        metrics.reset()
+        start = time.perf_counter()
+        with pipeline_run() as recorder:
+            news = news_scraper.run_news_pipeline()
+        wall = time.perf_counter() - start
+
+    stop.set()
+    worked = sorted(counts.get() for _ in workers)
+    for proc in workers:
+        proc.join()
+    stub.stop()
+    return {
+        'workers': args.workers,
+        'feeds': args.feeds,
+        'wall_seconds': round(wall, 4),
+        'items': len(news),
+        'jobs_by_workers': worked,
+        'jobs_by_run': recorder.counters.get('jobs_done', 0),
+        # Includes what the workers' jobs reported back to the run
+        'http_cache': {k: v for k, v in sorted(recorder.counters.items()) if k.startswith('http_cache_')},
+        'stages': {
+            stage: {k: (round(v, 6) if isinstance(v, float) else v)
+                    for k, v in entry.items() if k != 'by'}
+            for stage, entry in sorted(recorder.stages.items())
+        },
+        'stub_requests': stub.requests,
+    }
+
+
+def _child_args(args, workers):
+    return [
+        sys.executable, '-m', 'benchmarks.queue_workers', '--single',
+        '--workers', str(workers),
+        '--feeds', str(args.feeds),
+        '--latency-ms', str(args.latency_ms),
+        '--entries-per-feed', str(args.entries_per_feed),
+        '--article-kb', str(args.article_kb),
+        '--image-px', str(args.image_px),
+        '--gemini-latency-ms', str(args.gemini_latency_ms),
+        '--fetch-batch', str(args.fetch_batch),
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                        help='worker process counts to benchmark (default: 0 1 2 4)')
+    parser.add_argument('--feeds', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50, help='stub server latency per request')
+    parser.add_argument('--entries-per-feed', type=int, default=20)
+    parser.add_argument('--article-kb', type=int, default=50, help='article page size')
+    parser.add_argument('--image-px', type=int, default=1200, help='stub image width')
+    parser.add_argument('--gemini-latency-ms', type=float, default=1500)
+    parser.add_argument('--fetch-batch', type=int, default=10, help='feeds per fetch job (JOB_FETCH_BATCH_SIZE)')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.single:
+        args.workers = args.workers[0]
+        print(json.dumps(run_single(args)))
+        return 0
+
+    results = []
+    for workers in args.workers:
+        print(f'Benchmarking {workers} workers...', file=sys.stderr)
+        out = subprocess.run(_child_args(args, workers), cwd=ROOT, check=True,
+                             stdout=subprocess.PIPE, text=True).stdout
+        # The last stdout line is the JSON result; anything before is pipeline chatter
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    report = {
+        'benchmark': 'queue_workers',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('workers', 'output', 'single')},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
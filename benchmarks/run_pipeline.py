@@ -0,0 +1,160 @@
+"""
+End-to-end pipeline benchmark against local stubs.
+
+    python -m benchmarks.run_pipeline --feeds 10 100 1000 --output bench.json
+
+Each feed count runs in a fresh subprocess (so peak RSS is per size) with a
+throwaway DB and image folder. run_news_pipeline() and send_weekly_digest()
+run unmodified; only the network endpoints and the Gemini client are local.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, configure_for_stubs, git_commit, peak_rss_kb
+
+
+def run_single(args):
+    """Run one feed count in this process and return its result dict."""
+    from benchmarks.stubs import StubServer, StubSettings, FakeGemini
+
+    workdir = tempfile.mkdtemp(prefix='newsagg-bench-')
+    stub = StubServer(StubSettings(
+        latency_ms=args.latency_ms,
+        entries_per_feed=args.entries_per_feed,
+        article_kb=args.article_kb,
+        image_px=args.image_px,
+    )).start()
+
+    configure_for_stubs(stub, workdir, args.feeds)
+
+    from app import create_app, db, metrics
+    from app.metrics import pipeline_run
+    import scripts.news_scraper as news_scraper
+    from scripts.telegram_bot import send_weekly_digest
+
+    gemini = FakeGemini(latency_ms=args.gemini_latency_ms, ms_per_1k_tokens=args.gemini_ms_per_1k_tokens)
+    news_scraper.genai = gemini
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        metrics.reset()
+
+        start = time.perf_counter()
+        with pipeline_run() as recorder:
+            news = news_scraper.run_news_pipeline()
+            send_weekly_digest(news)
+        wall = time.perf_counter() - start
+
+        rerun = None
+        if args.rerun:
+            # Same week again after a reset: article pages and images come from the HTTP cache
+            first_requests = dict(stub.requests)
+            news_scraper.clear_old_data()
+            start = time.perf_counter()
+            with pipeline_run() as rerun_recorder:
+                send_weekly_digest(news_scraper.run_news_pipeline())
+            rerun = {
+                'wall_seconds': round(time.perf_counter() - start, 4),
+                'counters': rerun_recorder.counters,
+                'stub_requests': {k: v - first_requests.get(k, 0) for k, v in stub.requests.items()},
+            }
+
+    stub.stop()
+    return {
+        'feeds': args.feeds,
+        'wall_seconds': round(wall, 4),
+        'peak_rss_kb': peak_rss_kb(),
+        'items': len(news),
+        'stages': {
+            stage: {k: (round(v, 6) if isinstance(v, float) else v)
+                    for k, v in entry.items() if k != 'by'}
+            for stage, entry in sorted(recorder.stages.items())
+        },
+        'counters': recorder.counters,
+        'gemini': {'calls': gemini.calls, 'prompt_chars': gemini.prompt_chars,
+                   'max_prompt_chars': gemini.max_prompt_chars},
+        'stub_requests': first_requests if args.rerun else stub.requests,
+        'rerun': rerun,
+    }
+
+
+def _child_args(args, feeds):
+    return [
+        sys.executable, '-m', 'benchmarks.run_pipeline', '--single',
+        '--feeds', str(feeds),
+        '--latency-ms', str(args.latency_ms),
+        '--entries-per-feed', str(args.entries_per_feed),
+        '--article-kb', str(args.article_kb),
+        '--image-px', str(args.image_px),
+        '--gemini-latency-ms', str(args.gemini_latency_ms),
+        '--gemini-ms-per-1k-tokens', str(args.gemini_ms_per_1k_tokens),
+    ] + (['--rerun'] if args.rerun else [])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeds', type=int, nargs='+', default=[10, 100, 1000],
+                        help='feed counts to benchmark (default: 10 100 1000)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='stub server latency per request')
+    parser.add_argument('--entries-per-feed', type=int, default=20)
+    parser.add_argument('--article-kb', type=int, default=50, help='article page size')
+    parser.add_argument('--image-px', type=int, default=1200, help='stub image width')
+    parser.add_argument('--gemini-latency-ms', type=float, default=1500)
+    parser.add_argument('--gemini-ms-per-1k-tokens', type=float, default=50,
+                        help='extra Gemini latency per 1000 prompt tokens')
+    parser.add_argument('--rerun', action='store_true',
+                        help='clear the news data and run the same week again (HTTP cache warm)')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.single:
+        args.feeds = args.feeds[0]
+        print(json.dumps(run_single(args)))
+        return 0
+
+    results = []
+    for feeds in args.feeds:
+        print(f'Benchmarking {feeds} feeds...', file=sys.stderr)
+        out = subprocess.run(_child_args(args, feeds), cwd=ROOT, check=True,
+                             stdout=subprocess.PIPE, text=True).stdout
+        # The last stdout line is the JSON result; anything before is pipeline chatter
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    report = {
+        'benchmark': 'pipeline',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'latency_ms': args.latency_ms,
+            'entries_per_feed': args.entries_per_feed,
+            'article_kb': args.article_kb,
+            'image_px': args.image_px,
+            'gemini_latency_ms': args.gemini_latency_ms,
+            'gemini_ms_per_1k_tokens': args.gemini_ms_per_1k_tokens,
+            'rerun': args.rerun,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Local stand-ins for every external service the pipeline talks to: RSS feeds,
+article pages, image hosts, the Telegram Bot API and Gemini.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+
+class StubSettings:
+    def __init__(self, latency_ms=0, entries_per_feed=20, article_kb=50, image_px=1200,
+                 edu_ratio=0.5):
+        self.latency = latency_ms / 1000.0
+        self.entries_per_feed = entries_per_feed
+        self.article_kb = article_kb
+        self.image_px = image_px
+        # Fraction of entries that mention an education keyword
+        self.edu_ratio = edu_ratio
+
+
+def _make_image(px):
+    # Noise compresses poorly, so the JPEG is a realistic size for its dimensions
+    img = Image.effect_noise((px, px * 2 // 3), 64).convert('RGB')
+    buf = BytesIO()
+    img.save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BenchStub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/plain', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        stub = self.server.stub
+        time.sleep(stub.settings.latency)
+        stub.count(self.path)
+        path = self.path.split('?', 1)[0]
+
+        if path.startswith('/feeds/'):
+            body = stub.feed(path.rsplit('/', 1)[1].split('.')[0])
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            return self._send(200, body, 'application/rss+xml', {'ETag': etag})
+        if path.startswith('/articles/'):
+            return self._send(200, stub.article(path), 'text/html; charset=utf-8')
+        if path.startswith('/images/'):
+            return self._send(200, stub.image, 'image/jpeg')
+        self._send(404, b'not found')
+
+    def do_POST(self):
+        stub = self.server.stub
+        time.sleep(stub.settings.latency)
+        stub.count(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if '/sendMessage' in self.path or '/sendPhoto' in self.path:
+            return self._send(200, b'{"ok": true, "result": {}}', 'application/json')
+        self._send(404, b'not found')
+
+
+class StubServer:
+    """Threaded HTTP server serving feeds, articles, images and the Telegram API."""
+
+    def __init__(self, settings=None, host='127.0.0.1', port=0):
+        self.settings = settings or StubSettings()
+        self.image = _make_image(self.settings.image_px)
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def feed_urls(self, n):
+        return [f'{self.base_url}/feeds/{i}.xml' for i in range(n)]
+
+    def count(self, path):
+        kind = path.strip('/').split('/', 1)[0]
+        if kind.startswith('bot'):
+            kind = 'telegram'
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def feed(self, feed_id):
+        # Feeds are generated once so ETags stay stable between polls
+        with self._lock:
+            body = self._feeds.get(feed_id)
+        if body is not None:
+            return body
+
+        now = datetime.now(timezone.utc)
+        items = []
+        for i in range(self.settings.entries_per_feed):
+            is_edu = int((i + 1) * self.settings.edu_ratio) > int(i * self.settings.edu_ratio)
+            topic = 'students and teachers at the university' if is_edu else 'the markets'
+            published = format_datetime(now - timedelta(minutes=7 * i + int(feed_id)))
+            summary = (f'<p>Story {i} from feed {feed_id} about {topic}. </p>'
+                       f'<img src="{self.base_url}/images/{feed_id}/{i}.jpg"/>') * 3
+            items.append(
+                f'<item><title>Feed {feed_id} story {i} on {topic}</title>'
+                f'<link>{self.base_url}/articles/{feed_id}/{i}.html</link>'
+                f'<guid>{feed_id}-{i}</guid><pubDate>{published}</pubDate>'
+                f'<description><![CDATA[{summary}]]></description></item>'
+            )
+        body = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f'<title>Bench feed {feed_id}</title><link>{self.base_url}</link>'
+                + ''.join(items) + '</channel></rss>').encode()
+        with self._lock:
+            self._feeds[feed_id] = body
+        return body
+
+    def article(self, path):
+        image_path = path.replace('/articles/', '/images/').replace('.html', '.jpg')
+        filler = '<p>' + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 16 + '</p>'
+        repeat = max(1, self.settings.article_kb * 1024 // len(filler))
+        return (f'<html><head><meta property="og:image" content="{self.base_url}{image_path}">'
+                f'<title>Article</title></head><body>{filler * repeat}</body></html>').encode()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeGemini:
+    """
+    Drop-in for the `google.generativeai` module. Each call takes a fixed
+    latency plus ms_per_1k_tokens per thousand prompt tokens (~4 chars each),
+    so prompt size shows up in response time the way input processing does.
+    """
+
+    def __init__(self, latency_ms=0, ms_per_1k_tokens=0):
+        self.latency = latency_ms / 1000.0
+        self.per_token = ms_per_1k_tokens / 1000.0 / 1000.0
+        self.calls = 0
+        self.prompt_chars = 0
+        self.max_prompt_chars = 0
+
+    def configure(self, **kwargs):
+        pass
+
+    def GenerativeModel(self, name):
+        fake = self
+
+        class _Model:
+            def generate_content(self, prompt):
+                fake.calls += 1
+                fake.prompt_chars += len(prompt)
+                fake.max_prompt_chars = max(fake.max_prompt_chars, len(prompt))
+                time.sleep(fake.latency + fake.per_token * len(prompt) / 4)
+                return type('Response', (), {'text': json.dumps({'model': name, 'chars': len(prompt)})})()
+
+        return _Model()
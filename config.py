@@ -10,10 +10,30 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Applied on every new SQLite connection (ignored for other databases).
+    # WAL lets readers proceed while the pipeline writes; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 15000,  # ms
+        'mmap_size': 256 * 1024 * 1024,  # bytes
+        'cache_size': -64000,  # negative = KiB
+        'temp_store': 'MEMORY',
+    }
+
+    # Items per page on the index/dashboard (keyset paginated)
+    NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE') or 20)
+
+    # Response cache: bumped by the pipeline on commit, shared across processes
+    DATA_VERSION_FILE = os.path.join(basedir, 'instance', 'data_version')
+    RESPONSE_CACHE_SIZE = 128
    
     # Telegram configuration
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN') or 'Your_telegram_bot_token_here'
     TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID') or 'Your_telegram_chat_id_here'
+    TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL') or 'https://api.telegram.org'
    
     # Gemini API
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') or 'Your_gemini_api_key_here'
@@ -21,12 +41,92 @@ class Config:
     # Image storage
     UPLOAD_FOLDER = os.path.join(basedir, 'app/static/images')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+    # Images are served from /images/<content-hash> with a one-year immutable
+    # Cache-Control. Behind Apache/lighttpd set USE_X_SENDFILE; behind nginx
+    # set IMAGE_X_ACCEL_PREFIX to an `internal` location aliased to UPLOAD_FOLDER.
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    IMAGE_X_ACCEL_PREFIX = os.environ.get('IMAGE_X_ACCEL_PREFIX')
+
+    # Responsive image variants rendered via srcset ('avif' needs pillow-avif-plugin)
+    IMAGE_VARIANT_WIDTHS = [320, 640, 1024]
+    IMAGE_VARIANT_FORMATS = ['avif', 'webp']
+    IMAGE_VARIANT_QUALITY = 75
    
+    # /metrics (Prometheus scrape endpoint): bearer token for the scraper (logged-in users always allowed)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # /api/export: optional bearer token for tools (logged-in users always allowed)
+    EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')
+    EXPORT_BATCH_SIZE = 500  # rows fetched per round trip while streaming
+
     # RSS feeds
     RSS_FEEDS = [
         #list all rss_feeds of site you want scrape here
     ]
    
+    # Scheduler: jobs persist in the app DB (see scheduler.py)
+    SCHEDULER_JOBS_TABLE = 'apscheduler_jobs'
+    SCHEDULER_MISFIRE_GRACE_TIME = 60 * 60  # seconds a missed run may still start late
+
+    # Adaptive feed polling (see scripts/feed_poller.py). The scheduler checks
+    # for due feeds every FEED_POLL_TICK_SECONDS (0 disables); intervals in seconds.
+    FEED_POLL_TICK_SECONDS = int(os.environ.get('FEED_POLL_TICK_SECONDS') or 60)
+    FEED_POLL_MIN_INTERVAL = 5 * 60
+    FEED_POLL_MAX_INTERVAL = 6 * 60 * 60
+    FEED_POLL_MAX_BACKOFF = 24 * 60 * 60  # ceiling while a feed keeps failing
+    FEED_POLL_UNCHANGED_BACKOFF = 1.5  # multiplier per poll with nothing new
+    FEED_POLL_DELAY = 1  # seconds between feeds polled in the same batch
+    FEED_POLL_BATCH_SIZE = 50  # feeds fetched per staging transaction
+    FEED_STAGING_RETENTION_DAYS = 14
+    # Retention: rows older than RETENTION_WEEKS move to gzipped NDJSON segments
+    RETENTION_WEEKS = int(os.environ.get('RETENTION_WEEKS', 4))
+    ARCHIVE_FOLDER = os.environ.get('ARCHIVE_FOLDER') or os.path.join(basedir, 'instance', 'archive')
+    RETENTION_CHUNK_SIZE = 500  # rows archived per transaction
+    RETENTION_CHUNK_PAUSE = 0.05  # seconds between chunks
+    RETENTION_IMAGE_BATCH = 200  # orphaned images deleted between pauses
+    RETENTION_IMAGE_GRACE_SECONDS = 60 * 60  # never delete images younger than this
+
+    # Article/image scraping: worker threads and per-host politeness
+    SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 4))
+    CRAWL_DEFAULT_DELAY = 1.0  # seconds between requests to one host without a robots.txt Crawl-delay
+    CRAWL_MAX_DELAY = 30.0
+    CRAWL_ERROR_BACKOFF = 4  # delay multiplier at a 100% error rate is 1 + this
+    ROBOTS_TTL = 24 * 60 * 60  # seconds a fetched robots.txt is trusted
+    ROBOTS_ERROR_TTL = 15 * 60  # retry sooner when robots.txt was unreachable
+    # Per-host circuit breakers (image hosts, article sites and feeds)
+    BREAKER_THRESHOLD = 3  # consecutive failures before a host is skipped
+    BREAKER_COOLDOWN = 15 * 60  # seconds before the first retry probe
+    BREAKER_MAX_COOLDOWN = 24 * 60 * 60
+    NEGATIVE_CACHE_TTL = 7 * 24 * 60 * 60  # how long "no image found" is remembered
+
+    # On-disk HTTP cache for article pages and images (HTTP_CACHE_MAX_BYTES=0 disables it)
+    HTTP_CACHE_FOLDER = os.environ.get('HTTP_CACHE_FOLDER') or os.path.join(basedir, 'instance', 'http_cache')
+    HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', 512 * 1024 * 1024))  # LRU-evicted past this
+    HTTP_CACHE_MAX_ENTRY_BYTES = 8 * 1024 * 1024  # larger bodies are passed through, not stored
+    HTTP_CACHE_DEFAULT_TTL = 6 * 60 * 60  # seconds, when a response has no Cache-Control/Expires/Last-Modified
+
+    # Streaming feed reader limits
+    FEED_TIMEOUT = (5, 20)  # (connect, read) seconds
+    FEED_MAX_BYTES = int(os.environ.get('FEED_MAX_BYTES', 5 * 1024 * 1024))  # decoded body cap
+    FEED_MAX_ENTRIES = int(os.environ.get('FEED_MAX_ENTRIES', 50))  # newest entries kept per feed
+
+    # Job queue: with JOB_QUEUE set, a run queues its fetch/scrape/image/script
+    # work for `flask run-worker` processes (and works its own jobs while it waits)
+    JOB_QUEUE_ENABLED = os.environ.get('JOB_QUEUE', '').lower() in ('1', 'true', 'yes')
+    JOB_VISIBILITY_TIMEOUT = 5 * 60  # seconds a claimed job stays hidden without a lease renewal before another worker may take it
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_DELAY = 30  # seconds before the first retry, doubling per attempt
+    JOB_POLL_INTERVAL = 1.0  # seconds an idle worker sleeps between claims
+    JOB_WAIT_TIMEOUT = 30 * 60  # longest a run waits for its jobs
+    JOB_FETCH_BATCH_SIZE = 10  # feeds per fetch job
+    JOB_RETENTION_DAYS = 7  # finished jobs older than this are deleted
+
+    # Prompt compaction (see scripts/prompt_builder.py)
+    SUMMARY_MAX_CHARS = 600  # plain-text summary kept per entry at ingestion
+    PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 1200))  # estimated tokens for the stories block
+    PROMPT_STORY_TOKENS = 80  # summary tokens per story in a prompt
+
     EDUCATION_KEYWORDS = [
         #you can chnage these key words to key words of the content type you want eg politices, health, etc
         "education", "school", "student", "teacher", "university", "college",
@@ -1,6 +1,6 @@
+import click
 from app import create_app, db
 from app.models import User
-from scheduler import init_scheduler
 import os
 
 app = create_app()
@@ -18,10 +18,34 @@ def init_db():
         db.session.commit()
         print("Default user created: admin/password")
 
+@app.cli.command("apply-retention")
+def apply_retention_command():
+    """Archive rows past RETENTION_WEEKS and delete orphaned images."""
+    from scripts.retention import apply_retention
+    print(apply_retention())
+
+@app.cli.command("clear-data")
+def clear_data():
+    """Delete all news items, scripts and images (full reset, nothing archived)."""
+    from scripts.news_scraper import clear_old_data
+    if clear_old_data():
+        print("All news data cleared")
+
 @app.cli.command("run-scheduler")
 def run_scheduler():
-    """Run the scheduler."""
-    init_scheduler()
+    """Run the scheduler daemon (blocks until interrupted)."""
+    # Imported here so web workers loading run:app don't pull in APScheduler
+    from scheduler import run_scheduler_daemon
+    run_scheduler_daemon(app)
+
+@app.cli.command("run-worker")
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(['fetch', 'scrape', 'image', 'script']),
+              help="Only work jobs of this kind (repeatable). Default: all kinds.")
+@click.option('--burst', is_flag=True, help="Exit once no job is left instead of waiting for more.")
+def run_worker(kinds, burst):
+    """Work queued pipeline jobs (blocks until interrupted); start one per core or machine."""
+    from scripts.job_queue import run_worker_daemon
+    print(f"Worked {run_worker_daemon(kinds=kinds or None, burst=burst)} jobs")
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
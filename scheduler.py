@@ -1,36 +1,130 @@
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
-from scripts.news_scraper import run_news_pipeline
-from scripts.telegram_bot import send_weekly_digest
+from apscheduler.triggers.interval import IntervalTrigger
+from scripts.feed_poller import poll_due_feeds
+from scripts.retention import apply_retention
 from app import create_app
-from app.models import NewsItem, SocialMediaScript
-from datetime import datetime, timedelta
+from app.metrics import pipeline_run
+import logging
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_JOB_ID = 'weekly_digest'
+FEED_POLL_JOB_ID = 'feed_poll'
+RETENTION_JOB_ID = 'retention'
+
+# One app per scheduler process, shared by every job run
+_app = None
+
+def get_app():
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+# Jobs are stored in the DB, so they are referenced by "module:function"
+# and must only take picklable arguments.
 
 def scheduled_job():
+    # The pipeline's heavy dependencies load on the first run, not at daemon start
+    from scripts.news_scraper import run_news_pipeline
+    from scripts.telegram_bot import send_weekly_digest
+
     print("Running weekly news aggregation...")
-    app = create_app()
-    with app.app_context():
-        # Run the news pipeline
-        news_items_with_scripts = run_news_pipeline()
-        
-        # Send via Telegram
-        send_weekly_digest(news_items_with_scripts)
-        
+    with get_app().app_context():
+        with pipeline_run():
+            # Run the news pipeline
+            news_items_with_scripts = run_news_pipeline()
+
+            # Send via Telegram
+            send_weekly_digest(news_items_with_scripts)
+
         print("Weekly news aggregation completed!")
 
-def init_scheduler():
-    scheduler = BackgroundScheduler()
+def retention_job():
+    with get_app().app_context():
+        try:
+            logger.info("Retention: %s", apply_retention())
+        except Exception as e:
+            logger.error("Retention failed: %s", e)
+
+def poll_feeds_job():
+    # Each feed keeps its own adaptive next-poll time; this tick polls the due ones
+    with get_app().app_context():
+        try:
+            poll_due_feeds()
+        except Exception as e:
+            logger.error("Feed polling failed: %s", e)
+
+def create_scheduler(app):
+    """
+    Build a scheduler whose jobs persist in the app DB, so a restart keeps the
+    schedule and catches up (once, thanks to coalescing) on missed runs.
+    """
+    return BackgroundScheduler(
+        jobstores={
+            'default': SQLAlchemyJobStore(
+                url=app.config['SQLALCHEMY_DATABASE_URI'],
+                tablename=app.config['SCHEDULER_JOBS_TABLE'],
+            )
+        },
+        job_defaults={
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': app.config['SCHEDULER_MISFIRE_GRACE_TIME'],
+        },
+    )
+
+def sync_jobs(scheduler, app):
+    """Make the stored jobs match the current config."""
     # Run every Thursday at 6 PM
-    trigger = CronTrigger(day_of_week='thu', hour=18, minute=0)
-    scheduler.add_job(scheduled_job, trigger)
-    scheduler.start()
+    scheduler.add_job('scheduler:scheduled_job', CronTrigger(day_of_week='thu', hour=18, minute=0),
+                      id=WEEKLY_JOB_ID, replace_existing=True)
+
+    # Archive old rows and orphaned images nightly, outside publishing hours
+    scheduler.add_job('scheduler:retention_job', CronTrigger(hour=3, minute=30),
+                      id=RETENTION_JOB_ID, replace_existing=True)
+
+    tick = app.config.get('FEED_POLL_TICK_SECONDS')
+    if tick:
+        scheduler.add_job('scheduler:poll_feeds_job', IntervalTrigger(seconds=tick),
+                          id=FEED_POLL_JOB_ID, replace_existing=True)
+    elif scheduler.get_job(FEED_POLL_JOB_ID):
+        scheduler.remove_job(FEED_POLL_JOB_ID)
+
+def init_scheduler(app=None):
+    """Start the scheduler in the background and return it."""
+    global _app
+    if app is not None:
+        _app = app
+    app = get_app()
+
+    scheduler = create_scheduler(app)
+    # Start paused so the persisted jobs are loaded before we reconcile them
+    scheduler.start(paused=True)
+    sync_jobs(scheduler, app)
+    scheduler.resume()
     print("Scheduler started. Will run every Thursday at 6 PM.")
+    return scheduler
 
-if __name__ == "__main__":
-    init_scheduler()
-    # Keep the script running
+def run_scheduler_daemon(app=None):
+    """Run the scheduler until SIGINT/SIGTERM, sleeping instead of spinning."""
+    scheduler = init_scheduler(app)
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
     try:
-        while True:
-            pass
-    except (KeyboardInterrupt, SystemExit):
-        pass
\ No newline at end of file
+        stop.wait()
+    finally:
+        print("Shutting down scheduler...")
+        scheduler.shutdown()
+
+if __name__ == "__main__":
+    run_scheduler_daemon()
@@ -0,0 +1,510 @@
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from config import Config
+from app import db, metrics
+from app.models import HostPolicy, ImageMiss
+import requests
+import threading
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Per-host crawl policy
+# ---------------------------
+# Article pages and images come from many hosts, so requests are paced per
+# host rather than globally: each host gets at most one request per
+# crawl-delay (robots.txt Crawl-delay, or CRAWL_DEFAULT_DELAY), stretched
+# while the host keeps failing or answering 429/503. robots.txt is honoured
+# as in RFC 9309: 4xx means no rules, 5xx or unreachable means disallow
+# everything until a short retry TTL passes.
+#
+# Each host also has a circuit breaker. After BREAKER_THRESHOLD consecutive
+# failures it opens and requests to the host fail fast (HostUnavailable)
+# instead of spending connect timeouts and retries. Once the cooldown passes,
+# one half-open probe is let through: success closes the breaker, failure
+# reopens it with a doubled cooldown (capped at BREAKER_MAX_COOLDOWN).
+#
+# CrawlPolicy is built on the pipeline thread and used from scraper worker
+# threads. preload() reads the stored HostPolicy rows for known URLs in one
+# query; a host met only later (an image CDN, say) has its row read on first
+# use through a connection of its own, as worker threads can't use the
+# session. save() merges the state back into the rows, so robots.txt, error
+# rates and breaker state survive between runs and concurrent writers don't
+# wipe each other's counts.
+#
+# Job workers each hold a long-lived policy, so they re-read the rows of the
+# hosts a job touches (preload(refresh=True)) to see breakers other workers
+# opened, and reserve request slots in HostPolicy.next_request_at
+# (shared_pacing=True) with a compare-and-set, so any number of workers
+# together keep to one host's crawl delay.
+
+ROBOTS_MAX_BYTES = 512 * 1024
+
+# Compare-and-set rounds for a shared request slot before pacing locally
+_RESERVE_ATTEMPTS = 5
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+class CrawlSkipped(Exception):
+    """A URL the policy refused to fetch."""
+
+class CrawlDisallowed(CrawlSkipped):
+    """robots.txt forbids the URL."""
+
+class HostUnavailable(CrawlSkipped):
+    """The host's circuit breaker is open."""
+
+def host_of(url):
+    """(host[:port], scheme) of a URL; robots.txt and pacing are per host and port."""
+    parts = urlsplit(url)
+    return parts.netloc.rsplit('@', 1)[-1].lower(), parts.scheme or 'https'
+
+class _HostState:
+    __slots__ = ('host', 'robots_txt', 'robots_status', 'robots_expires_at', 'parser', 'crawl_delay',
+                 'request_count', 'error_count', 'error_rate', 'last_request_at', 'next_request_at',
+                 'breaker_state', 'consecutive_failures', 'breaker_until', 'probe_in_flight',
+                 'hold_until', 'saved_requests', 'saved_errors', 'lock', 'dirty')
+
+    def __init__(self, host):
+        self.host = host
+        self.robots_txt = None
+        self.robots_status = None
+        self.robots_expires_at = None
+        self.parser = None
+        self.crawl_delay = None
+        self.request_count = 0
+        self.error_count = 0
+        self.error_rate = 0.0
+        self.last_request_at = None
+        self.next_request_at = 0.0  # time.monotonic() of the next allowed request
+        self.breaker_state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.breaker_until = None
+        self.probe_in_flight = False
+        self.hold_until = None  # wall-clock end of a Retry-After, shared on save()
+        # Counts as last read from / written to the row; save() adds only what's new
+        self.saved_requests = 0
+        self.saved_errors = 0
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    @classmethod
+    def from_row(cls, row):
+        state = cls(row.host)
+        state.load_row(row)
+        return state
+
+    def load_row(self, row):
+        """Take the stored fields from row; pacing and probe state stay as they are."""
+        if row.robots_expires_at != self.robots_expires_at:
+            self.parser = None
+        self.robots_txt = row.robots_txt
+        self.robots_status = row.robots_status
+        self.robots_expires_at = row.robots_expires_at
+        self.crawl_delay = row.crawl_delay
+        self.request_count = self.saved_requests = row.request_count or 0
+        self.error_count = self.saved_errors = row.error_count or 0
+        self.error_rate = row.error_rate or 0.0
+        self.last_request_at = row.last_request_at
+        self.breaker_state = row.breaker_state or BREAKER_CLOSED
+        self.consecutive_failures = row.consecutive_failures or 0
+        self.breaker_until = row.breaker_until
+        if self.breaker_state != BREAKER_HALF_OPEN:
+            self.probe_in_flight = False
+
+def _newer(a, b):
+    return a is not None and (b is None or a >= b)
+
+class CrawlPolicy:
+    def __init__(self, user_agent=None, session=None, shared_pacing=False):
+        self.user_agent = user_agent or getattr(Config, "REQUEST_USER_AGENT", None) or "NewsScraper/1.0 (+https://your.domain)"
+        self.session = session or requests.Session()
+        self.shared_pacing = shared_pacing
+        self._engine = db.engine
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    # --- persistence (pipeline thread only) ---
+
+    def preload(self, urls, refresh=False):
+        """
+        Load stored policies for the hosts of `urls` in one query. With
+        refresh=True hosts already loaded are re-read too (unless they have
+        unsaved changes), picking up what other processes stored.
+        """
+        hosts = {host_of(url)[0] for url in urls}
+        hosts.discard('')
+        if not refresh:
+            hosts -= set(self._hosts)
+        if not hosts:
+            return
+        rows = HostPolicy.query.filter(HostPolicy.host.in_(hosts)).all()
+        with self._lock:
+            for row in rows:
+                state = self._hosts.get(row.host)
+                if state is None:
+                    self._hosts[row.host] = _HostState.from_row(row)
+                    continue
+                with state.lock:
+                    if not state.dirty:
+                        state.load_row(row)
+        db.session.rollback()
+
+    def save(self, commit=True):
+        """
+        Merge every host touched since loading into its stored row, which
+        other runs or workers may have updated meanwhile. Returns the number saved.
+        """
+        dirty = [s for s in self._hosts.values() if s.dirty]
+        if not dirty:
+            return 0
+        rows = {r.host: r for r in HostPolicy.query.filter(
+            HostPolicy.host.in_([s.host for s in dirty])).with_for_update()}
+        for state in dirty:
+            row = rows.get(state.host)
+            if row is None:
+                row = HostPolicy(host=state.host)
+                db.session.add(row)
+            with state.lock:
+                self._merge(state, row)
+                state.dirty = False
+        if commit:
+            with metrics.timed('db_commit'):
+                db.session.commit()
+        return len(dirty)
+
+    @staticmethod
+    def _merge(state, row):
+        """Combine state and row into both. Caller holds state.lock."""
+        # Counters: add what was counted here since the row was last read
+        row.request_count = (row.request_count or 0) + state.request_count - state.saved_requests
+        row.error_count = (row.error_count or 0) + state.error_count - state.saved_errors
+        state.request_count = state.saved_requests = row.request_count
+        state.error_count = state.saved_errors = row.error_count
+
+        # robots.txt: the most recent fetch wins
+        if _newer(state.robots_expires_at, row.robots_expires_at):
+            row.robots_txt = state.robots_txt
+            row.robots_status = state.robots_status
+            row.robots_expires_at = state.robots_expires_at
+            row.crawl_delay = state.crawl_delay
+        else:
+            state.robots_txt = row.robots_txt
+            state.robots_status = row.robots_status
+            state.robots_expires_at = row.robots_expires_at
+            state.crawl_delay = row.crawl_delay
+            state.parser = None
+
+        # A Retry-After holds every process off the host
+        if _newer(state.hold_until, row.next_request_at):
+            row.next_request_at = state.hold_until
+        state.hold_until = None
+
+        # Error rate and breaker: the most recent request to the host wins
+        if _newer(state.last_request_at, row.last_request_at) or row.last_request_at is None:
+            row.last_request_at = state.last_request_at
+            row.error_rate = state.error_rate
+            row.breaker_state = state.breaker_state
+            row.consecutive_failures = state.consecutive_failures
+            row.breaker_until = state.breaker_until
+        else:
+            state.last_request_at = row.last_request_at
+            state.error_rate = row.error_rate
+            state.breaker_state = row.breaker_state
+            state.consecutive_failures = row.consecutive_failures
+            state.breaker_until = row.breaker_until
+            if state.breaker_state != BREAKER_HALF_OPEN:
+                state.probe_in_flight = False
+
+    # --- policy (safe from worker threads) ---
+
+    def _state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+        if state is None:
+            state = self._load(host)
+            with self._lock:
+                state = self._hosts.setdefault(host, state)
+        return state
+
+    def _load(self, host):
+        """State for a host that wasn't preloaded, from its stored row if there is one."""
+        table = HostPolicy.__table__
+        try:
+            with self._engine.connect() as conn:
+                row = conn.execute(select(table).where(table.c.host == host)).first()
+        except SQLAlchemyError as e:
+            logger.warning("Could not load the crawl policy for %s: %s", host, e)
+            row = None
+        return _HostState.from_row(row) if row is not None else _HostState(host)
+
+    def _refresh_robots(self, state, scheme):
+        """Fetch robots.txt if missing or expired. Caller holds state.lock."""
+        now = datetime.utcnow()
+        if state.robots_expires_at and state.robots_expires_at > now:
+            if state.parser is None:
+                state.parser = self._parse(state.robots_status, state.robots_txt)
+            return
+
+        url = f"{scheme}://{state.host}/robots.txt"
+        text = None
+        try:
+            with metrics.timed('robots_fetch'), \
+                    self.session.get(url, timeout=(5, 10), stream=True,
+                                     headers={'User-Agent': self.user_agent}) as resp:
+                status = resp.status_code
+                if status < 300:
+                    body = resp.raw.read(ROBOTS_MAX_BYTES, decode_content=True)
+                    text = body.decode(resp.encoding or 'utf-8', errors='replace')
+        except Exception as e:
+            logger.info("robots.txt for %s unreachable: %s", state.host, e)
+            status = 0
+            self._update(state, failed=True)
+
+        ttl = Config.ROBOTS_TTL if 0 < status < 500 else Config.ROBOTS_ERROR_TTL
+        state.robots_status = status
+        state.robots_txt = text
+        state.robots_expires_at = now + timedelta(seconds=ttl)
+        state.parser = self._parse(status, text)
+        state.crawl_delay = state.parser.crawl_delay(self.user_agent) if text is not None else None
+        state.dirty = True
+
+    @staticmethod
+    def _parse(status, text):
+        parser = RobotFileParser()
+        if text is not None:
+            parser.parse(text.splitlines())
+        elif status and 400 <= status < 500:
+            parser.allow_all = True
+        else:
+            # 5xx or unreachable: assume complete disallow until the retry TTL passes
+            parser.disallow_all = True
+        return parser
+
+    def allowed(self, url):
+        host, scheme = host_of(url)
+        if not host:
+            return False
+        state = self._state(host)
+        with state.lock:
+            self._refresh_robots(state, scheme)
+            return state.parser.can_fetch(self.user_agent, url)
+
+    def delay_for(self, state):
+        base = state.crawl_delay if state.crawl_delay is not None else Config.CRAWL_DEFAULT_DELAY
+        # Back off while the host keeps failing (error_rate is a moving average in [0, 1])
+        delay = base * (1 + Config.CRAWL_ERROR_BACKOFF * state.error_rate)
+        return min(delay, Config.CRAWL_MAX_DELAY)
+
+    def wait(self, url):
+        """Block until this host's next request slot, and reserve it."""
+        state = self._state(host_of(url)[0])
+        with state.lock:
+            now = time.monotonic()
+            slot = max(now, state.next_request_at)
+            delay = self.delay_for(state)
+            state.next_request_at = slot + delay
+        if self.shared_pacing:
+            wait = self._reserve_slot(state.host, slot - now, delay)
+            slot = max(slot, now + wait) if wait is not None else slot
+        if slot > now:
+            metrics.observe('crawl_wait', slot - now)
+            time.sleep(slot - now)
+
+    def _reserve_slot(self, host, earliest, delay):
+        """
+        Take the host's next slot in HostPolicy.next_request_at, no sooner
+        than `earliest` seconds from now, and push it on by `delay`. A
+        conditional UPDATE makes this a compare-and-set, so concurrent
+        workers get distinct slots. Returns seconds to wait, or None if the
+        slot couldn't be reserved (pacing is then local only).
+        """
+        table = HostPolicy.__table__
+        for _ in range(_RESERVE_ATTEMPTS):
+            now = datetime.utcnow()
+            earliest_at = now + timedelta(seconds=earliest)
+            try:
+                with self._engine.begin() as conn:
+                    row = conn.execute(select(table.c.next_request_at).where(table.c.host == host)).first()
+                    if row is None:
+                        conn.execute(table.insert().values(
+                            host=host, next_request_at=earliest_at + timedelta(seconds=delay)))
+                        return earliest
+                    current = row.next_request_at
+                    slot = max(earliest_at, current) if current else earliest_at
+                    unchanged = table.c.next_request_at.is_(None) if current is None else table.c.next_request_at == current
+                    updated = conn.execute(update(table).where(table.c.host == host, unchanged).values(
+                        next_request_at=slot + timedelta(seconds=delay))).rowcount
+                    if updated:
+                        return (slot - now).total_seconds()
+            except IntegrityError:
+                continue  # another worker inserted the row first
+            except SQLAlchemyError as e:
+                logger.warning("Could not reserve a request slot for %s: %s", host, e)
+                return None
+        metrics.incr('crawl_slot_contended')
+        return None
+
+    def available(self, url):
+        """
+        False while the host's breaker is open. After the cooldown the first
+        caller gets True as the half-open probe; others keep getting False
+        until that probe's result is recorded.
+        """
+        state = self._state(host_of(url)[0])
+        with state.lock:
+            if state.breaker_state == BREAKER_CLOSED:
+                return True
+            if state.breaker_state == BREAKER_OPEN and state.breaker_until and state.breaker_until <= datetime.utcnow():
+                state.breaker_state = BREAKER_HALF_OPEN
+                state.probe_in_flight = False
+                state.dirty = True
+            if state.breaker_state == BREAKER_HALF_OPEN and not state.probe_in_flight:
+                state.probe_in_flight = True
+                return True
+            return False
+
+    def _release_probe(self, url):
+        # A half-open probe that never reached the network (robots.txt said no)
+        state = self._state(host_of(url)[0])
+        with state.lock:
+            state.probe_in_flight = False
+
+    def _update(self, state, failed, retry_after=None):
+        """Counters, error rate and breaker transitions. Caller holds state.lock."""
+        state.request_count += 1
+        state.last_request_at = datetime.utcnow()
+        state.dirty = True
+        if retry_after:
+            hold = min(retry_after, Config.CRAWL_MAX_DELAY)
+            state.next_request_at = max(state.next_request_at, time.monotonic() + hold)
+            state.hold_until = datetime.utcnow() + timedelta(seconds=hold)
+        if not failed:
+            state.error_rate = 0.7 * state.error_rate
+            state.consecutive_failures = 0
+            if state.breaker_state != BREAKER_CLOSED:
+                logger.info("Circuit for %s closed", state.host)
+            state.breaker_state = BREAKER_CLOSED
+            state.breaker_until = None
+            state.probe_in_flight = False
+            return
+
+        state.error_count += 1
+        state.error_rate = 0.7 * state.error_rate + 0.3
+        state.consecutive_failures += 1
+        if state.breaker_state == BREAKER_HALF_OPEN or state.consecutive_failures >= Config.BREAKER_THRESHOLD:
+            # Cooldown doubles with every failure past the threshold
+            excess = max(0, state.consecutive_failures - Config.BREAKER_THRESHOLD)
+            cooldown = min(Config.BREAKER_COOLDOWN * 2 ** min(excess, 16), Config.BREAKER_MAX_COOLDOWN)
+            if state.breaker_state != BREAKER_OPEN:
+                metrics.incr('breaker_opened')
+            logger.warning("Circuit for %s open for %ds after %d consecutive failures",
+                           state.host, cooldown, state.consecutive_failures)
+            state.breaker_state = BREAKER_OPEN
+            state.breaker_until = datetime.utcnow() + timedelta(seconds=cooldown)
+            state.probe_in_flight = False
+
+    def record(self, url, status, retry_after=None):
+        """Record a response (status None for a network error) for pacing, breakers and persistence."""
+        state = self._state(host_of(url)[0])
+        failed = status is None or status == 429 or status >= 500
+        with state.lock:
+            self._update(state, failed, retry_after)
+
+    def record_exception(self, url, exc):
+        """Record a failed fetch; only errors that say the host is unhealthy count as failures."""
+        response = getattr(exc, 'response', None)
+        if response is not None:
+            self.record(url, response.status_code)
+        elif isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            self.record(url, None)
+        else:
+            # The host answered (bad body, parse error, size cap): it's up
+            self.record(url, 200)
+
+    def request(self, session, method, url, **kwargs):
+        """
+        session.request() that honours breakers, robots.txt and per-host pacing.
+        Raises HostUnavailable while the host's breaker is open and
+        CrawlDisallowed when robots.txt forbids the URL.
+        """
+        if not self.available(url):
+            metrics.incr('breaker_skipped')
+            raise HostUnavailable(url)
+        if not self.allowed(url):
+            self._release_probe(url)
+            metrics.incr('crawl_disallowed')
+            raise CrawlDisallowed(url)
+        self.wait(url)
+        try:
+            resp = session.request(method, url, **kwargs)
+        except Exception as e:
+            self.record_exception(url, e)
+            raise
+        retry_after = resp.headers.get('Retry-After')
+        self.record(url, resp.status_code,
+                    int(retry_after) if retry_after and retry_after.isdigit() else None)
+        return resp
+
+class NegativeCache:
+    """
+    Article URLs where no usable image was found, so later runs skip the
+    page fetch. Entries expire after NEGATIVE_CACHE_TTL, since articles do
+    get images added. Loaded and saved on the pipeline thread; add() is
+    safe from workers.
+    """
+
+    def __init__(self):
+        self._known = set()
+        self._new = {}
+        self._lock = threading.Lock()
+
+    def preload(self, urls):
+        urls = list(set(urls))
+        if not urls:
+            return
+        now = datetime.utcnow()
+        self._known.update(
+            link for (link,) in db.session.query(ImageMiss.link).filter(
+                ImageMiss.link.in_(urls), ImageMiss.expires_at > now
+            )
+        )
+        db.session.rollback()
+
+    def __contains__(self, url):
+        return url in self._known
+
+    def add(self, url, reason):
+        with self._lock:
+            self._known.add(url)
+            self._new[url] = reason
+
+    def save(self, commit=True):
+        """Persist entries added since preload() and drop expired ones. Returns the number added."""
+        with self._lock:
+            new, self._new = self._new, {}
+        now = datetime.utcnow()
+        ImageMiss.query.filter(ImageMiss.expires_at <= now).delete(synchronize_session=False)
+        if new:
+            rows = {r.link: r for r in ImageMiss.query.filter(ImageMiss.link.in_(list(new)))}
+            expires_at = now + timedelta(seconds=Config.NEGATIVE_CACHE_TTL)
+            for url, reason in new.items():
+                row = rows.get(url)
+                if row is None:
+                    row = ImageMiss(link=url)
+                    db.session.add(row)
+                row.reason = reason
+                row.checked_at = now
+                row.expires_at = expires_at
+        if commit:
+            with metrics.timed('db_commit'):
+                db.session.commit()
+        return len(new)
@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta
+from statistics import median
+from config import Config
+from app import db, metrics
+from app.models import FeedState, FeedEntry
+from scripts.feed_reader import FeedItem, read_feed
+from scripts.crawl_policy import CrawlPolicy
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Adaptive per-feed polling
+# ---------------------------
+# Each feed is polled on its own cadence, learned from the gaps between its
+# entries' publish times. Unchanged responses (304 or nothing new) and errors
+# back the cadence off; new entries land in the FeedEntry staging table,
+# which the weekly digest reads instead of fetching every feed itself.
+
+def estimate_publish_interval(published_times, previous=None):
+    """
+    Median gap (seconds) between the most recent publish times, smoothed with
+    the previous estimate. Returns `previous` if there's too little data.
+    """
+    times = sorted((t for t in published_times if t), reverse=True)[:20]
+    gaps = [(a - b).total_seconds() for a, b in zip(times, times[1:])]
+    gaps = [g for g in gaps if g > 0]
+    if not gaps:
+        return previous
+    observed = median(gaps)
+    if previous:
+        observed = (observed + previous) / 2
+    return int(observed)
+
+def next_poll_interval(state):
+    """Seconds until the next poll, given the state after the latest poll."""
+    min_interval = Config.FEED_POLL_MIN_INTERVAL
+    max_interval = Config.FEED_POLL_MAX_INTERVAL
+
+    if state.error_count:
+        # Exponential backoff on failures, allowed to exceed the normal ceiling
+        return min(min_interval * 2 ** state.error_count, Config.FEED_POLL_MAX_BACKOFF)
+
+    # Poll about twice per expected publish interval
+    base = (state.publish_interval or max_interval) / 2
+    # Back off gently while the feed keeps returning nothing new
+    base *= Config.FEED_POLL_UNCHANGED_BACKOFF ** min(state.unchanged_count, 10)
+    return int(min(max(base, min_interval), max_interval))
+
+def _fetch(feed_url, etag=None, modified=None, policy=None):
+    """Network half of a poll: returns (FeedResult, None) or (None, error). No DB access."""
+    try:
+        result = read_feed(feed_url, etag=etag, modified=modified)
+    except Exception as e:
+        if policy is not None:
+            policy.record_exception(feed_url, e)
+        return None, e
+    if policy is not None:
+        policy.record(feed_url, result.status)
+    return result, None
+
+def _apply(state, result, error, now):
+    """DB half of a poll: stage new entries and reschedule. Returns new entry count."""
+    new_count = 0
+    if error is not None:
+        logger.warning("Polling %s failed: %s", state.url, error)
+        state.error_count = (state.error_count or 0) + 1
+        state.last_status = 'error'
+        metrics.incr('feed_errors')
+    else:
+        state.error_count = 0
+        state.etag = result.etag or state.etag
+        state.modified = result.modified or state.modified
+
+        if result.status == 304:
+            state.last_status = 'not_modified'
+        else:
+            entries = [e for e in result.entries if e.link]
+            state.publish_interval = estimate_publish_interval(
+                [e.published for e in entries], state.publish_interval)
+
+            links = [e.link for e in entries]
+            known = {
+                link for (link,) in
+                db.session.query(FeedEntry.link).filter(FeedEntry.link.in_(links))
+            } if links else set()
+            for entry in entries:
+                if entry.link in known:
+                    continue
+                known.add(entry.link)
+                db.session.add(FeedEntry(
+                    feed_url=state.url,
+                    title=entry.title,
+                    link=entry.link,
+                    summary=entry.summary,
+                    published=entry.published,
+                    fetched_at=now,
+                ))
+                new_count += 1
+            state.last_status = 'ok'
+
+        state.unchanged_count = 0 if new_count else (state.unchanged_count or 0) + 1
+
+    state.last_polled_at = now
+    state.poll_interval = next_poll_interval(state)
+    state.next_poll_at = now + timedelta(seconds=state.poll_interval)
+    metrics.incr('feeds_polled')
+    metrics.incr('entries_staged', new_count)
+
+    logger.info("Polled %s: %s, %d new, next in %ds", state.url, state.last_status, new_count, state.poll_interval)
+    return new_count
+
+def _poll_batch(feed_urls):
+    """
+    Fetch a batch of feeds, then stage all of their results in one
+    transaction, so the write lock is held once per batch and never
+    across network I/O.
+    """
+    states = {s.url: s for s in FeedState.query.filter(FeedState.url.in_(feed_urls))}
+    conditional = {url: (s.etag, s.modified) for url, s in states.items()}
+    # Feeds on hosts whose circuit breaker is open are skipped without a request
+    policy = CrawlPolicy()
+    policy.preload(feed_urls)
+    db.session.rollback()  # don't hold a read transaction open while fetching
+
+    fetched = []
+    for i, feed_url in enumerate(feed_urls):
+        if not policy.available(feed_url):
+            logger.info("Skipping %s: host circuit open", feed_url)
+            metrics.incr('breaker_skipped')
+            continue
+        etag, modified = conditional.get(feed_url, (None, None))
+        fetched.append((feed_url,) + _fetch(feed_url, etag, modified, policy))
+        if i < len(feed_urls) - 1:
+            time.sleep(Config.FEED_POLL_DELAY)  # be polite
+
+    now = datetime.utcnow()
+    total = 0
+    states = {s.url: s for s in FeedState.query.filter(FeedState.url.in_(feed_urls))}
+    for feed_url, result, error in fetched:
+        state = states.get(feed_url)
+        if state is None:
+            state = FeedState(url=feed_url, error_count=0, unchanged_count=0)
+            db.session.add(state)
+        total += _apply(state, result, error, now)
+    policy.save(commit=False)
+    with metrics.timed('db_commit'):
+        db.session.commit()
+    return total
+
+def poll_feed(feed_url):
+    """
+    Conditionally fetch one feed and stage its new entries.
+    Runs under an app context and commits. Returns: number of new entries.
+    """
+    return _poll_batch([feed_url])
+
+def poll_feeds(feed_urls):
+    """
+    Conditionally fetch a batch of feeds (no due-time check) and stage their
+    new entries in one transaction. Returns: number of new entries.
+    """
+    return _poll_batch(list(feed_urls))
+
+def poll_due_feeds(force=False):
+    """
+    Poll every configured feed whose next poll time has passed (all of them
+    if force=True) and prune old staging rows. Returns: total new entries.
+    """
+    now = datetime.utcnow()
+    feeds = list(Config.RSS_FEEDS)
+    if not force:
+        scheduled = {
+            s.url: s.next_poll_at for s in FeedState.query.filter(FeedState.url.in_(feeds))
+        } if feeds else {}
+        feeds = [f for f in feeds if scheduled.get(f) is None or scheduled[f] <= now]
+
+    total = 0
+    batch_size = Config.FEED_POLL_BATCH_SIZE
+    for start in range(0, len(feeds), batch_size):
+        batch = feeds[start:start + batch_size]
+        try:
+            total += _poll_batch(batch)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error polling feeds {batch[0]}..{batch[-1]}: {e}")
+        if start + batch_size < len(feeds):
+            time.sleep(Config.FEED_POLL_DELAY)  # be polite
+
+    prune_staged_entries()
+    return total
+
+def prune_staged_entries():
+    cutoff = datetime.utcnow() - timedelta(days=Config.FEED_STAGING_RETENTION_DAYS)
+    deleted = FeedEntry.query.filter(FeedEntry.fetched_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    if deleted:
+        logger.info("Pruned %d staged feed entries older than %s", deleted, cutoff)
+    return deleted
+
+def load_staged_entries(since):
+    """Staged entries published since `since`, as FeedItems (columns only, no ORM objects)."""
+    rows = db.session.query(
+        FeedEntry.title, FeedEntry.link, FeedEntry.summary, FeedEntry.published
+    ).filter(FeedEntry.published >= since)
+    return [FeedItem(title, link, summary, published) for title, link, summary, published in rows]
@@ -0,0 +1,270 @@
+import requests
+from datetime import datetime
+from calendar import timegm
+from hashlib import blake2b
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dateutil import parser as date_parser
+from xml.etree.ElementTree import XMLPullParser, ParseError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+from app import metrics
+from scripts.prompt_builder import clean_summary
+import threading
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Streaming, bounded feed reader
+# ---------------------------
+# Feeds are downloaded with connect/read timeouts and a cap on decoded bytes
+# (gzip is decoded as it streams, so a compressed bomb can't slip past the
+# cap), parsed incrementally as chunks arrive, and the download stops as soon
+# as FEED_MAX_ENTRIES items have been read. Feeds list newest first and the
+# pipeline only keeps this week's news, so the tail is never needed.
+# Malformed XML that the strict parser rejects before its first entry falls
+# back to feedparser on the (already capped) bytes; an error further in keeps
+# the entries read up to it. Summaries are reduced to plain text here, once,
+# so everything downstream (staging, NewsItems, prompts) stores the short form.
+
+class FeedTooLarge(Exception):
+    pass
+
+# Query parameters that only track the click and never change the article
+_TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def normalize_link(link):
+    """Canonical form of an article URL: lowercase host, no fragment, no tracking params."""
+    try:
+        parts = urlsplit(link.strip())
+    except ValueError:
+        return link.strip()
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith(_TRACKING_PARAMS)])
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+def link_hash(link):
+    """64-bit hash of the normalized link, used to dedupe syndicated copies of a story."""
+    return int.from_bytes(blake2b(normalize_link(link).encode(), digest_size=8).digest(), 'big')
+
+class FeedItem:
+    """
+    One feed entry as it moves through the pipeline. Slotted, with the
+    publish time already parsed to a naive UTC datetime (or None) and the
+    link hash computed up front; the lowercased keyword-match text is built
+    on first use, so entries dropped by the date filter never pay for it.
+    """
+    __slots__ = ('title', 'link', 'summary', 'published', 'link_hash', '_match_text')
+
+    def __init__(self, title, link, summary, published=None):
+        self.title = title or ''
+        self.link = (link or '').strip()
+        self.summary = summary or ''
+        self.published = published
+        self.link_hash = link_hash(self.link) if self.link else 0
+        self._match_text = None
+
+    @property
+    def match_text(self):
+        if self._match_text is None:
+            self._match_text = (self.title + " " + self.summary).lower()
+        return self._match_text
+
+    def __repr__(self):
+        return f"FeedItem({self.title!r}, {self.link!r}, published={self.published!r})"
+
+class FeedResult:
+    """Outcome of one feed fetch: HTTP status, cache validators and FeedItems."""
+    __slots__ = ('status', 'etag', 'modified', 'entries', 'bytes_read', 'truncated')
+
+    def __init__(self, status, etag=None, modified=None, entries=None, bytes_read=0, truncated=False):
+        self.status = status
+        self.etag = etag
+        self.modified = modified
+        self.entries = entries or []
+        self.bytes_read = bytes_read
+        self.truncated = truncated
+
+_session_local = threading.local()
+
+def _get_session():
+    # One pooled session per thread, so repeated polls reuse connections
+    session = getattr(_session_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        retry = Retry(total=1, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        ua = getattr(Config, "REQUEST_USER_AGENT", None) or "NewsScraper/1.0 (+https://your.domain)"
+        session.headers.update({
+            'User-Agent': ua,
+            'Accept': 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        _session_local.session = session
+    return session
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+def _text(elem):
+    return ''.join(elem.itertext()).strip() if elem is not None else ''
+
+def _to_utc_naive(value):
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return value
+
+def parse_date(raw):
+    """Parse an RSS/Atom date string to a naive UTC datetime, or None."""
+    if not raw:
+        return None
+    try:
+        return _to_utc_naive(date_parser.parse(raw))
+    except Exception:
+        return None
+
+def _entry_from_element(elem):
+    """Extract title/link/summary/published from an RSS <item> or Atom <entry>."""
+    title = link = summary = content = published = ''
+    for child in elem:
+        name = _local(child.tag)
+        if name == 'title':
+            title = _text(child)
+        elif name == 'link':
+            href = child.get('href')
+            if href:
+                # Atom: prefer rel="alternate" (or no rel) links
+                if not link and child.get('rel', 'alternate') == 'alternate':
+                    link = href.strip()
+            elif not link:
+                link = _text(child)
+        elif name in ('description', 'summary'):
+            summary = summary or _text(child)
+        elif name in ('encoded', 'content') and not content:
+            content = _text(child)
+        elif name in ('pubDate', 'published', 'date', 'issued'):
+            published = published or _text(child)
+        elif name == 'updated' and not published:
+            published = _text(child)
+        elif name == 'guid' and not link and child.get('isPermaLink', 'true') == 'true':
+            link = _text(child)
+    return FeedItem(title, link, clean_summary(summary or content), parse_date(published))
+
+def _entries_from_feedparser(body, max_entries):
+    import feedparser  # only needed for feeds the strict parser rejects
+    parsed = feedparser.parse(body)
+    entries = []
+    for entry in parsed.entries[:max_entries]:
+        stamp = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
+        entries.append(FeedItem(
+            getattr(entry, 'title', ''),
+            getattr(entry, 'link', ''),
+            clean_summary(getattr(entry, 'summary', '')),
+            datetime.utcfromtimestamp(timegm(stamp)) if stamp
+            else parse_date(getattr(entry, 'published', '')),
+        ))
+    if not entries and parsed.get('bozo'):
+        raise parsed.get('bozo_exception') or ValueError("unreadable feed")
+    return entries
+
+def read_feed(feed_url, etag=None, modified=None, max_entries=None, max_bytes=None, timeout=None, session=None):
+    """
+    Fetch and parse a feed with bounded time and memory.
+    - etag/modified: validators from the previous fetch (sent as conditional headers)
+    - returns: FeedResult; status 304 means unchanged (no entries)
+    - raises: on network errors, HTTP >= 400, oversize bodies or unparseable feeds
+    """
+    max_entries = max_entries or Config.FEED_MAX_ENTRIES
+    max_bytes = max_bytes or Config.FEED_MAX_BYTES
+    timeout = timeout or Config.FEED_TIMEOUT
+    session = session or _get_session()
+
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+
+    start = time.perf_counter()
+    parse_seconds = 0.0
+    try:
+        with session.get(feed_url, headers=headers, stream=True, timeout=timeout) as resp:
+            validators = dict(etag=resp.headers.get('ETag'), modified=resp.headers.get('Last-Modified'))
+            if resp.status_code == 304:
+                return FeedResult(304, **validators)
+            resp.raise_for_status()
+
+            declared = resp.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise FeedTooLarge(f"Content-Length {declared} exceeds {max_bytes}")
+
+            parser = XMLPullParser(events=('end',))
+            # Raw bytes are kept for the feedparser fallback only until a chunk
+            # has parsed cleanly into entries; after that a parse error just
+            # ends the feed at the entries read so far
+            chunks = []
+            entries = []
+            total = 0
+            truncated = False
+            strict = True
+            # iter_content decodes gzip/deflate, so the cap applies to decoded bytes
+            for chunk in resp.iter_content(chunk_size=16384):
+                if not chunk:
+                    continue
+                total += len(chunk)
+                if total > max_bytes:
+                    raise FeedTooLarge(f"Feed body exceeds {max_bytes} bytes")
+                if chunks is not None:
+                    chunks.append(chunk)
+                if not strict:
+                    continue
+
+                parse_start = time.perf_counter()
+                try:
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        if _local(elem.tag) in ('item', 'entry'):
+                            entries.append(_entry_from_element(elem))
+                            elem.clear()
+                            if len(entries) >= max_entries:
+                                truncated = True
+                                break
+                except ParseError as e:
+                    parse_seconds += time.perf_counter() - parse_start
+                    if chunks is None:
+                        logger.debug("Malformed XML in %s after %d entries (%s); keeping those",
+                                     feed_url, len(entries), e)
+                        break
+                    logger.debug("Strict parse failed for %s (%s); falling back to feedparser", feed_url, e)
+                    strict = False
+                    continue
+                parse_seconds += time.perf_counter() - parse_start
+                if entries:
+                    chunks = None
+                if truncated:
+                    # Stop downloading; closing the response drops the connection
+                    break
+
+            if not strict:
+                parse_start = time.perf_counter()
+                entries = _entries_from_feedparser(b''.join(chunks), max_entries)
+                parse_seconds += time.perf_counter() - parse_start
+            elif not truncated:
+                try:
+                    parser.close()
+                except ParseError as e:
+                    if not entries:
+                        raise ValueError(f"unreadable feed: {e}")
+
+            return FeedResult(resp.status_code, entries=entries, bytes_read=total,
+                              truncated=truncated, **validators)
+    finally:
+        metrics.observe('feed_fetch', time.perf_counter() - start - parse_seconds, feed=feed_url)
+        metrics.observe('feed_parse', parse_seconds, feed=feed_url)
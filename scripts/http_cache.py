@@ -0,0 +1,336 @@
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from requests.structures import CaseInsensitiveDict
+from config import Config
+from app import metrics
+import requests
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# On-disk HTTP cache
+# ---------------------------
+# Article pages and images fetched by the scraper are kept under
+# HTTP_CACHE_FOLDER, so re-running the pipeline on the same week's stories
+# reads them from disk instead of the network. Freshness follows the
+# response's Cache-Control (no-store, no-cache, max-age) or Expires; with
+# neither, Last-Modified gives the usual 10% heuristic and otherwise
+# HTTP_CACHE_DEFAULT_TTL applies. Stale entries with an ETag or
+# Last-Modified are revalidated with a conditional GET, and a 304 answers
+# from disk. Each entry is a body file plus a small JSON meta file, both
+# written via a temp file and os.replace(); the meta file's mtime is the
+# LRU clock, and the least recently used entries are evicted once the
+# folder grows past HTTP_CACHE_MAX_BYTES.
+
+# Response headers kept with an entry (the body is stored decoded, so
+# Content-Encoding/Content-Length are not)
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Date')
+
+# Evict down to this fraction of the budget, so eviction doesn't run on every store
+_EVICT_TO = 0.9
+
+def _cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+def _http_time(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def freshness_lifetime(headers, now=None):
+    """
+    Seconds a 200 response may be reused without revalidation, or None if it
+    must not be stored at all.
+    """
+    now = now or time.time()
+    directives = _cache_control(headers.get('Cache-Control'))
+    if 'no-store' in directives or headers.get('Vary', '').strip() == '*':
+        return None
+    if 'no-cache' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            return max(0, int(directives['max-age']))
+        except ValueError:
+            return 0
+    date = _http_time(headers.get('Date')) or now
+    if headers.get('Expires'):
+        expires = _http_time(headers['Expires'])
+        return max(0, int(expires - date)) if expires else 0
+    last_modified = _http_time(headers.get('Last-Modified'))
+    if last_modified:
+        return int(min(max(0, date - last_modified) / 10, Config.HTTP_CACHE_DEFAULT_TTL))
+    return Config.HTTP_CACHE_DEFAULT_TTL
+
+class _TeeRaw:
+    """
+    Stands in for response.raw: hands the decoded body to requests and
+    copies it into a temp file, which becomes a cache entry only if the
+    body is read to the end (a caller that stops early leaves nothing).
+    """
+
+    def __init__(self, raw, cache, url, meta):
+        self._raw = raw
+        self._cache = cache
+        self._url = url
+        self._meta = meta
+        self._tmp_path = cache._body_path(url) + f'.{uuid.uuid4().hex}.part'
+        self._fh = open(self._tmp_path, 'wb')
+        self._size = 0
+
+    def read(self, amt=None, **kwargs):
+        data = self._raw.read(amt, decode_content=True)
+        if self._fh is not None:
+            if data:
+                self._size += len(data)
+                if self._size > Config.HTTP_CACHE_MAX_ENTRY_BYTES:
+                    self._discard()
+                else:
+                    self._fh.write(data)
+            else:
+                self._fh.close()
+                self._fh = None
+                self._cache._commit(self._url, self._tmp_path, self._meta, self._size)
+        return data
+
+    def _discard(self):
+        self._fh.close()
+        self._fh = None
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self._fh is not None:
+            self._discard()
+        self._raw.close()
+
+    def release_conn(self):
+        release = getattr(self._raw, 'release_conn', None)
+        if release is not None:
+            release()
+
+class HttpCache:
+    """
+    Disk cache in front of GET requests. Safe to share between threads; several
+    processes may share a folder (a torn pair of files is detected and treated as a miss).
+    """
+
+    def __init__(self, folder=None, max_bytes=None):
+        self.folder = folder or Config.HTTP_CACHE_FOLDER
+        self.max_bytes = max_bytes or Config.HTTP_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, counted on first store
+        os.makedirs(self.folder, exist_ok=True)
+
+    # --- layout ---
+
+    def _key(self, url):
+        return sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, url):
+        return os.path.join(self.folder, self._key(url) + '.body')
+
+    def _meta_path(self, url):
+        return os.path.join(self.folder, self._key(url) + '.json')
+
+    def _load(self, url):
+        try:
+            with open(self._meta_path(url), encoding='utf-8') as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get('url') == url else None
+
+    def _write_meta(self, url, meta):
+        path = self._meta_path(url)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.part'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp_path, path)
+
+    def _meta_for(self, url, resp, now):
+        lifetime = freshness_lifetime(resp.headers, now)
+        if lifetime is None:
+            return None
+        return {
+            'url': url,
+            'status': resp.status_code,
+            'headers': {k: resp.headers[k] for k in _KEPT_HEADERS if k in resp.headers},
+            'stored_at': now,
+            'fresh_until': now + lifetime,
+        }
+
+    # --- entries ---
+
+    def _commit(self, url, tmp_path, meta, size):
+        # Body first: a reader that finds the new meta always finds a body of the right size
+        meta['size'] = size
+        body_path = self._body_path(url)
+        try:
+            replaced = os.path.getsize(body_path)
+        except OSError:
+            replaced = 0
+        try:
+            os.replace(tmp_path, body_path)
+            self._write_meta(url, meta)
+        except OSError as e:
+            logger.warning("Could not store %s in the HTTP cache: %s", url, e)
+            return
+        metrics.incr('http_cache_stored')
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()[0]
+            else:
+                self._size += size - replaced
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _response(self, url, meta):
+        """A requests.Response served from the stored body, or None if the entry is incomplete."""
+        try:
+            body = open(self._body_path(url), 'rb')
+        except OSError:
+            return None
+        if os.fstat(body.fileno()).st_size != meta.get('size'):
+            body.close()
+            return None
+        try:
+            os.utime(self._meta_path(url))  # mark as recently used
+        except OSError:
+            pass
+        resp = requests.Response()
+        resp.status_code = meta['status']
+        resp.reason = 'OK'
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(meta['headers'])
+        resp.headers['Content-Length'] = str(meta['size'])
+        resp.headers['X-Cache'] = 'HIT'
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp.raw = body
+        return resp
+
+    def fetch(self, url, send, stream=False):
+        """
+        GET `url` through the cache. `send(headers)` performs the network
+        request with stream=True and the extra (conditional) headers given.
+        Returns a requests.Response; unless stream=True its content is loaded.
+        """
+        now = time.time()
+        meta = self._load(url)
+        if meta is not None and meta['fresh_until'] > now:
+            resp = self._response(url, meta)
+            if resp is not None:
+                metrics.incr('http_cache_hits')
+                return resp
+            meta = None
+
+        validators = {}
+        if meta is not None:
+            if meta['headers'].get('ETag'):
+                validators['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                validators['If-Modified-Since'] = meta['headers']['Last-Modified']
+        resp = send(validators)
+
+        if validators and resp.status_code == 304:
+            resp.close()
+            # Still valid: keep the body, refresh validators and freshness from the 304
+            refreshed = dict(meta['headers'], **{k: resp.headers[k] for k in _KEPT_HEADERS if k in resp.headers})
+            lifetime = freshness_lifetime(refreshed, now)
+            meta.update(headers=refreshed, fresh_until=now + (lifetime or 0))
+            cached = self._response(url, meta)
+            if cached is not None:
+                self._write_meta(url, meta)
+                metrics.incr('http_cache_revalidated')
+                return cached
+            resp = send({})
+
+        metrics.incr('http_cache_misses')
+        if resp.status_code == 200:
+            entry = self._meta_for(url, resp, now)
+            if entry is not None:
+                resp.raw = _TeeRaw(resp.raw, self, url, entry)
+                resp.headers.pop('Content-Encoding', None)  # the tee hands over decoded bytes
+        if not stream:
+            resp.content
+        return resp
+
+    # --- eviction ---
+
+    def _disk_usage(self):
+        entries = []
+        total = 0
+        abandoned = time.time() - 60 * 60
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith('.part'):
+                    # Left behind by a process that died mid-write
+                    try:
+                        if entry.stat().st_mtime < abandoned:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                if not entry.name.endswith('.json'):
+                    continue
+                key = entry.name[:-5]
+                try:
+                    used = entry.stat().st_mtime
+                    size = os.path.getsize(os.path.join(self.folder, key + '.body'))
+                except OSError:
+                    size = 0
+                    used = 0
+                entries.append((used, key, size))
+                total += size
+        return total, entries
+
+    def evict(self):
+        """Delete least recently used entries until the folder is back under budget. Returns entries removed."""
+        with self._lock:
+            total, entries = self._disk_usage()
+            target = self.max_bytes * _EVICT_TO
+            removed = 0
+            for _, key, size in sorted(entries):
+                if total <= target:
+                    break
+                for suffix in ('.json', '.body'):
+                    try:
+                        os.remove(os.path.join(self.folder, key + suffix))
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+            self._size = total
+        if removed:
+            metrics.incr('http_cache_evicted', removed)
+            logger.info("Evicted %d HTTP cache entries (%d bytes kept)", removed, total)
+        return removed
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_http_cache():
+    """The process-wide cache under HTTP_CACHE_FOLDER, or None when HTTP_CACHE_MAX_BYTES is 0."""
+    global _default_cache
+    if not Config.HTTP_CACHE_MAX_BYTES:
+        return None
+    with _default_lock:
+        if _default_cache is None or _default_cache.folder != Config.HTTP_CACHE_FOLDER:
+            _default_cache = HttpCache()
+        return _default_cache
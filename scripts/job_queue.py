@@ -0,0 +1,319 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from config import Config
+from app import db, metrics
+from app.models import Job
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# DB-backed job queue
+# ---------------------------
+# Pipeline work (feed fetches, article scrapes, image downloads, Gemini
+# scripts) can be queued as Job rows and worked by any number of
+# `flask run-worker` processes sharing the database. A claim takes a lease:
+# the job stays hidden for JOB_VISIBILITY_TIMEOUT seconds, renewed every
+# third of that while its handler runs, and if the worker dies before
+# finishing, the lease lapses and another worker picks it up.
+# On PostgreSQL claims use SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+# workers never wait on each other's rows; elsewhere (SQLite) a conditional
+# UPDATE acts as a compare-and-set on the lease. Finishing a job is guarded
+# by the lease owner, so a worker whose lease lapsed can't overwrite the
+# result of the worker that took over.
+
+JOB_KINDS = ('fetch', 'scrape', 'image', 'script')
+
+# Claim candidates tried per round on databases without SKIP LOCKED
+_CLAIM_CANDIDATES = 10
+
+class ClaimedJob:
+    """What a worker needs from a claimed Job, detached from the session."""
+    __slots__ = ('id', 'kind', 'batch', 'payload', 'attempts', 'max_attempts', 'owner')
+
+    def __init__(self, job, owner):
+        self.id = job.id
+        self.kind = job.kind
+        self.batch = job.batch
+        self.payload = job.payload or {}
+        self.attempts = job.attempts
+        self.max_attempts = job.max_attempts
+        self.owner = owner
+
+def new_batch():
+    """Id grouping the jobs queued by one pipeline run."""
+    return uuid.uuid4().hex
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"[:100]
+
+def enqueue(kind, payload, batch=None, commit=True, max_attempts=None):
+    """Queue one job. With commit=False it joins the caller's transaction."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    job = Job(
+        kind=kind,
+        batch=batch,
+        payload=payload,
+        max_attempts=max_attempts or Config.JOB_MAX_ATTEMPTS,
+        available_at=datetime.utcnow(),
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+    metrics.incr('jobs_queued', kind=kind)
+    return job
+
+def _claimable(now, batch=None, kinds=None):
+    # Queued and due, or running with a lapsed lease (its worker died or hung)
+    condition = or_(
+        and_(Job.status == 'queued', Job.available_at <= now),
+        and_(Job.status == 'running', Job.lease_expires_at < now),
+    )
+    if batch is not None:
+        condition = and_(condition, Job.batch == batch)
+    if kinds:
+        condition = and_(condition, Job.kind.in_(list(kinds)))
+    return condition
+
+def _lease(now, owner):
+    return {
+        'status': 'running',
+        'lease_owner': owner,
+        'lease_expires_at': now + timedelta(seconds=Config.JOB_VISIBILITY_TIMEOUT),
+        'attempts': Job.attempts + 1,
+    }
+
+def _claim_skip_locked(owner, now, batch, kinds):
+    job = db.session.execute(
+        select(Job).where(_claimable(now, batch, kinds)).order_by(Job.id).limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        db.session.rollback()
+        return None
+    for key, value in _lease(now, owner).items():
+        setattr(job, key, value)
+    db.session.flush()
+    claimed = ClaimedJob(job, owner)
+    db.session.commit()
+    return claimed
+
+def _claim_lease(owner, now, batch, kinds):
+    candidates = [
+        job_id for (job_id,) in
+        db.session.query(Job.id).filter(_claimable(now, batch, kinds)).order_by(Job.id).limit(_CLAIM_CANDIDATES)
+    ]
+    for job_id in candidates:
+        # Re-checking the claim condition in the UPDATE makes it a compare-and-set:
+        # if another worker got there first, no row matches and we try the next one
+        updated = Job.query.filter(Job.id == job_id, _claimable(now, batch, kinds)).update(
+            _lease(now, owner), synchronize_session=False)
+        if updated:
+            db.session.commit()
+            claimed = ClaimedJob(db.session.get(Job, job_id), owner)
+            db.session.rollback()
+            return claimed
+        db.session.rollback()
+    return None
+
+def claim(owner, batch=None, kinds=None):
+    """Lease the oldest runnable job (optionally of one batch or some kinds). Returns a ClaimedJob or None."""
+    while True:
+        now = datetime.utcnow()
+        if db.engine.dialect.name == 'postgresql':
+            claimed = _claim_skip_locked(owner, now, batch, kinds)
+        else:
+            claimed = _claim_lease(owner, now, batch, kinds)
+        if claimed is None or claimed.attempts <= claimed.max_attempts:
+            return claimed
+        # Its lease lapsed on every attempt: stop handing it out and try the next job
+        metrics.incr('jobs_lease_expired', kind=claimed.kind)
+        _finish(claimed, status='failed', error='visibility timeout expired on every attempt')
+
+def _finish(claimed, **values):
+    """Update a job we still hold the lease on, committing with any pending work. Returns False if the lease was lost."""
+    updated = Job.query.filter(
+        Job.id == claimed.id, Job.status == 'running', Job.lease_owner == claimed.owner
+    ).update(dict(values, lease_owner=None, lease_expires_at=None), synchronize_session=False)
+    if not updated:
+        db.session.rollback()
+        logger.warning("Lost the lease on %s job %d before finishing; discarding its outcome", claimed.kind, claimed.id)
+        return False
+    with metrics.timed('db_commit'):
+        db.session.commit()
+    return True
+
+def complete(claimed, result=None):
+    """Mark a claimed job done (committing anything the handler queued with it)."""
+    return _finish(claimed, status='done', result=result, error=None, finished_at=datetime.utcnow())
+
+def fail(claimed, error):
+    """Retry later with exponential backoff, or give up after max_attempts."""
+    db.session.rollback()  # drop whatever the handler left half-done
+    if claimed.attempts >= claimed.max_attempts:
+        metrics.incr('jobs_failed', kind=claimed.kind)
+        return _finish(claimed, status='failed', error=str(error), finished_at=datetime.utcnow())
+    delay = Config.JOB_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+    metrics.incr('jobs_retried', kind=claimed.kind)
+    return _finish(claimed, status='queued', error=str(error),
+                   available_at=datetime.utcnow() + timedelta(seconds=delay))
+
+class _Heartbeat:
+    """
+    Renew a claimed job's lease from a background thread while its handler
+    runs, so a slow job isn't handed to a second worker. Renewal goes
+    through its own connection and only matches while we still hold the
+    lease; once it's lost the heartbeat stops.
+    """
+
+    def __init__(self, claimed):
+        self.claimed = claimed
+        self.engine = db.engine
+        self.interval = Config.JOB_VISIBILITY_TIMEOUT / 3
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"lease-{claimed.id}", daemon=True)
+
+    def _renew(self):
+        expires = datetime.utcnow() + timedelta(seconds=Config.JOB_VISIBILITY_TIMEOUT)
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(Job)
+                .where(Job.id == self.claimed.id, Job.status == 'running', Job.lease_owner == self.claimed.owner)
+                .values(lease_expires_at=expires)
+            ).rowcount
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            try:
+                renewed = self._renew()
+            except Exception as e:
+                # e.g. the handler's own transaction holds the SQLite write lock; retry next beat
+                logger.warning("Could not renew the lease on %s job %d: %s", self.claimed.kind, self.claimed.id, e)
+                continue
+            if not renewed:
+                logger.warning("Lost the lease on %s job %d while running it", self.claimed.kind, self.claimed.id)
+                return
+
+    def __enter__(self):
+        if self.interval > 0:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        return False
+
+def _handlers():
+    # Handlers pull in the whole pipeline; load them on first use
+    from scripts.tasks import HANDLERS
+    return HANDLERS
+
+def work_one(owner, batch=None, kinds=None):
+    """Claim and run one job. Returns False if there was nothing to do."""
+    claimed = claim(owner, batch, kinds)
+    if claimed is None:
+        return False
+    handler = _handlers()[claimed.kind]
+    try:
+        with _Heartbeat(claimed), metrics.captured() as counters, metrics.timed('job', kind=claimed.kind):
+            result = handler(claimed)
+    except Exception as e:
+        logger.exception("%s job %d failed (attempt %d/%d): %s",
+                         claimed.kind, claimed.id, claimed.attempts, claimed.max_attempts, e)
+        fail(claimed, e)
+        return True
+    if counters and isinstance(result, dict) and not metrics.run_active():
+        # No run in this process to count them: report them to the run that queued the job
+        result = dict(result, counters=counters)
+    if complete(claimed, result):
+        metrics.incr('jobs_done', kind=claimed.kind)
+    return True
+
+def pending_count(batch):
+    count = Job.query.filter(Job.batch == batch, Job.status.in_(('queued', 'running'))).count()
+    db.session.rollback()
+    return count
+
+def wait_for_batch(batch, timeout=None, owner=None):
+    """
+    Block until every job of `batch` has finished, working the batch's jobs
+    in this thread meanwhile so a run completes even with no workers up.
+    Returns False if JOB_WAIT_TIMEOUT passed first.
+    """
+    timeout = timeout or Config.JOB_WAIT_TIMEOUT
+    owner = owner or default_worker_id()
+    deadline = time.monotonic() + timeout
+    with metrics.timed('job_wait'):
+        while pending_count(batch):
+            if time.monotonic() > deadline:
+                logger.warning("Timed out waiting for jobs of batch %s", batch)
+                return False
+            if not work_one(owner, batch=batch):
+                # Everything left is leased to other workers (or backing off)
+                time.sleep(Config.JOB_POLL_INTERVAL)
+    return True
+
+def batch_results(batch, kind):
+    """(payload, result) of the batch's finished jobs of one kind."""
+    rows = db.session.query(Job.payload, Job.result).filter(
+        Job.batch == batch, Job.kind == kind, Job.status == 'done'
+    ).all()
+    db.session.rollback()
+    return rows
+
+def finish_batch(batch):
+    """
+    Drop a run's done and still-queued jobs (failed ones stay for
+    inspection) and prune finished jobs older than JOB_RETENTION_DAYS.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=Config.JOB_RETENTION_DAYS)
+    Job.query.filter(Job.batch == batch, Job.status.in_(('done', 'queued'))).delete(synchronize_session=False)
+    Job.query.filter(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+def run_worker(kinds=None, stop=None, burst=False):
+    """
+    Work jobs until `stop` is set (or, with burst=True, until the queue is
+    empty). Runs under an app context. Returns: number of jobs worked.
+    """
+    stop = stop or threading.Event()
+    owner = default_worker_id()
+    worked = 0
+    logger.info("Worker %s started (kinds: %s)", owner, ', '.join(kinds) if kinds else 'all')
+    while not stop.is_set():
+        try:
+            ran = work_one(owner, kinds=kinds)
+        except Exception as e:
+            # e.g. the database was briefly unavailable; keep the worker alive
+            db.session.rollback()
+            logger.error("Worker %s could not claim a job: %s", owner, e)
+            ran = False
+        if ran:
+            worked += 1
+            continue
+        if burst:
+            break
+        stop.wait(Config.JOB_POLL_INTERVAL)
+    logger.info("Worker %s stopped after %d jobs", owner, worked)
+    return worked
+
+def run_worker_daemon(kinds=None, burst=False):
+    """run_worker() until SIGINT/SIGTERM; the job in hand is finished first."""
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+    return run_worker(kinds=kinds, stop=stop, burst=burst)
@@ -1,18 +1,22 @@
-import feedparser
 from datetime import datetime, timedelta
-from dateutil import parser as date_parser
-import google.generativeai as genai
 import requests
 from bs4 import BeautifulSoup
 import os
 from urllib.parse import urljoin, urlparse
 import hashlib
-from PIL import Image, UnidentifiedImageError
+from PIL import Image, ImageOps, UnidentifiedImageError
 from io import BytesIO
 from config import Config
-from app import db
+from app import db, metrics
+from app.cache import bump_data_version
 from app.models import NewsItem, SocialMediaScript, UnifiedScript
-import time
+from scripts.feed_poller import poll_due_feeds, load_staged_entries
+from scripts.prompt_builder import build_prompt
+from scripts.retention import apply_retention
+from scripts.job_queue import new_batch, finish_batch
+from scripts.crawl_policy import CrawlPolicy, CrawlSkipped, NegativeCache
+from scripts.http_cache import default_http_cache
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 import logging
 
@@ -26,6 +30,17 @@ from werkzeug.utils import secure_filename
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# google.generativeai takes about half a second to import, so it is loaded on
+# the first Gemini call rather than with the module
+genai = None
+
+def _get_genai():
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
 # --- Helper: clear old DB rows and images ---
 from sqlalchemy import inspect
 from sqlalchemy.exc import OperationalError
@@ -57,21 +72,23 @@ def clear_old_data(auto_create_missing_tables=False):
                 # refresh inspector after create_all
                 inspector = inspect(db.engine)
 
-        # Delete rows from each table only if it exists
-        for tablename, model in table_map.items():
-            try:
-                if tablename in inspector.get_table_names():
+        # Delete rows from each table only if it exists, all in one transaction
+        existing_tables = set(inspector.get_table_names())
+        try:
+            for tablename, model in table_map.items():
+                if tablename in existing_tables:
                     logger.info("Deleting rows from table: %s", tablename)
                     db.session.query(model).delete()
-                    db.session.commit()
                 else:
                     logger.info("Table %s does not exist. Skipping delete.", tablename)
-            except OperationalError as oe:
-                db.session.rollback()
-                logger.error("OperationalError while clearing %s: %s", tablename, oe)
-            except Exception as e:
-                db.session.rollback()
-                logger.exception("Unexpected error when clearing table %s: %s", tablename, e)
+            with metrics.timed('db_commit'):
+                db.session.commit()
+        except OperationalError as oe:
+            db.session.rollback()
+            logger.error("OperationalError while clearing tables: %s", oe)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Unexpected error when clearing tables: %s", e)
 
         # Clear image directory
         upload_folder = getattr(Config, "UPLOAD_FOLDER", None)
@@ -87,6 +104,7 @@ def clear_old_data(auto_create_missing_tables=False):
                     logger.error("Failed to delete %s. Reason: %s", file_path, e)
             logger.info("Successfully cleared image directory")
 
+        bump_data_version()
         return True
 
     except Exception as e:
@@ -99,53 +117,37 @@ def clear_old_data(auto_create_missing_tables=False):
         return False
 
 
-def fetch_news():
-    news_items = []
-    for feed_url in Config.RSS_FEEDS:
-        try:
-            parsed_feed = feedparser.parse(feed_url)
-            for entry in parsed_feed.entries:
-                news_items.append({
-                    'title': getattr(entry, 'title', '') or '',
-                    'link': getattr(entry, 'link', '') or '',
-                    'published': getattr(entry, 'published', '') or '',
-                    'summary': getattr(entry, 'summary', '') or ''
-                })
-            time.sleep(1)  # be polite
-        except Exception as e:
-            logger.error(f"Error parsing feed {feed_url}: {e}")
-    return news_items
-
 def filter_education(news_items):
-    filtered = []
-    for item in news_items:
-        text = (item['title'] + " " + item['summary']).lower()
-        if any(keyword in text for keyword in Config.EDUCATION_KEYWORDS):
-            filtered.append(item)
-    return filtered
+    keywords = [keyword.lower() for keyword in Config.EDUCATION_KEYWORDS]
+    return [
+        item for item in news_items
+        if any(keyword in item.match_text for keyword in keywords)
+    ]
 
 def filter_this_week(news_items):
     today = datetime.utcnow().date()
     start_of_week = today - timedelta(days=today.weekday())
     return [
         item for item in news_items
-        if item.get('published') and is_this_week(item['published'], start_of_week)
+        if item.published and is_this_week(item.published, start_of_week)
     ]
 
-def is_this_week(pub_str, start_of_week):
-    try:
-        pub_date = date_parser.parse(pub_str).date()
-        return pub_date >= start_of_week
-    except Exception:
-        return False
+def is_this_week(published, start_of_week):
+    return published.date() >= start_of_week
+
+def dedupe_items(news_items):
+    """Drop repeats of the same story (same normalized link), keeping the first seen."""
+    seen = set()
+    unique = []
+    for item in news_items:
+        if item.link_hash in seen:
+            continue
+        seen.add(item.link_hash)
+        unique.append(item)
+    return unique
 
 def get_latest(news_items, limit=10):
-    def parse_date_safe(item):
-        try:
-            return date_parser.parse(item['published'])
-        except:
-            return datetime.min
-    sorted_news = sorted(news_items, key=parse_date_safe, reverse=True)
+    sorted_news = sorted(news_items, key=lambda item: item.published or datetime.min, reverse=True)
     return sorted_news[:limit]
 
 # ---------------------------
@@ -181,6 +183,15 @@ def _make_session_with_retries(total_retries=3, backoff_factor=0.8, status_force
     session.headers.update({'User-Agent': ua})
     return session
 
+def _make_crawl_session():
+    """
+    Session for requests made through a CrawlPolicy. No transport retries:
+    every attempt is then paced and recorded by the policy, and the breaker
+    decides when a failing host is tried again. Share one per run (or
+    worker) so connections to a host are reused.
+    """
+    return _make_session_with_retries(total_retries=0, status_forcelist=())
+
 def _ext_from_url(url):
     path = urlparse(url).path
     ext = os.path.splitext(path)[1].lower()
@@ -192,16 +203,61 @@ def _ext_from_content_type(content_type):
     content_type = content_type.split(';', 1)[0].strip().lower()
     return _CONTENT_TYPE_EXT.get(content_type) or mimetypes.guess_extension(content_type) or None
 
-def download_image(article_url, image_url=None, upload_folder=None, session=None, max_size=5 * 1024 * 1024, timeout=(5, 20)):
+def _get(session, policy, url, http_cache=None, **kwargs):
+    # Through the crawl policy (robots.txt + per-host pacing) when one is given
+    if policy is None:
+        send = lambda **kw: session.get(url, **kw)
+    else:
+        send = lambda **kw: policy.request(session, 'GET', url, **kw)
+    if http_cache is None:
+        return send(**kwargs)
+    # Fresh cache hits are a local read; only misses and revalidations reach the policy
+    stream = kwargs.pop('stream', False)
+    headers = kwargs.pop('headers', None) or {}
+    return http_cache.fetch(url, lambda extra: send(stream=True, headers=dict(headers, **extra), **kwargs), stream=stream)
+
+def _remember_miss(negative_cache, article_url, reason):
+    # Only for definite answers about the article, never for network errors
+    if negative_cache is not None:
+        negative_cache.add(article_url, reason)
+
+def scrape_article_image(article_url, session=None, policy=None, timeout=(5, 20), http_cache=None):
+    """
+    Fetch an article page and pick its image: og:image, else the first
+    <img> that isn't a logo/icon. Returns the URL as found on the page
+    (possibly relative) or None. Network errors and CrawlSkipped propagate.
+    """
+    if session is None:
+        session = _make_crawl_session() if policy is not None else _make_session_with_retries()
+    with metrics.timed('article_scrape'):
+        resp = _get(session, policy, article_url, timeout=timeout, http_cache=http_cache)
+        resp.raise_for_status()
+        soup = BeautifulSoup(resp.content, 'html.parser')
+    og_image = soup.find('meta', property='og:image')
+    if og_image and og_image.get('content'):
+        return og_image['content'].strip()
+    # pick first non-logo/icon image
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src') or ''
+        if src:
+            if ('logo' in src.lower()) or ('icon' in src.lower()):
+                continue
+            return src.strip()
+    return None
+
+def download_image(article_url, image_url=None, upload_folder=None, session=None, max_size=5 * 1024 * 1024, timeout=(5, 20), policy=None, negative_cache=None, http_cache=None):
     """
     Robust image downloader.
     - article_url: URL of the article page (used to resolve relative image urls)
     - image_url: optional direct image URL; if None we'll extract from article page
+    - policy: optional CrawlPolicy; URLs robots.txt disallows or on hosts with an open breaker are skipped
+    - negative_cache: optional NegativeCache; articles with no usable image are added to it
+    - http_cache: optional HttpCache for the article page and image requests
     - returns: filename (string) saved inside Config.UPLOAD_FOLDER, or None on failure
     """
     try:
         if session is None:
-            session = _make_session_with_retries()
+            session = _make_crawl_session() if policy is not None else _make_session_with_retries()
 
         # Prefer explicit upload_folder, else config
         if upload_folder is None:
@@ -222,81 +278,58 @@ def download_image(article_url, image_url=None, upload_folder=None, session=None
         else:
             # Try to fetch the article HTML and scrape for og:image or first reasonable <img>
             try:
-                resp = session.get(article_url, timeout=timeout)
-                resp.raise_for_status()
-                soup = BeautifulSoup(resp.content, 'html.parser')
-                og_image = soup.find('meta', property='og:image')
-                if og_image and og_image.get('content'):
-                    resolved_image_url = og_image['content'].strip()
-                else:
-                    # pick first non-logo/icon image
-                    images = soup.find_all('img')
-                    for img in images:
-                        src = img.get('src') or img.get('data-src') or ''
-                        if src:
-                            if ('logo' in src.lower()) or ('icon' in src.lower()):
-                                continue
-                            resolved_image_url = src.strip()
-                            break
-                    # if still nothing, leave resolved_image_url None
+                resolved_image_url = scrape_article_image(article_url, session, policy, timeout, http_cache)
+            except CrawlSkipped as e:
+                logger.info("Skipping article %s: %s", article_url, type(e).__name__)
+                return None
             except Exception as e:
                 logger.warning("Failed to fetch article page for image scraping: %s. Error: %s", article_url, e)
-                resolved_image_url = None
+                return None
 
         if not resolved_image_url:
             logger.info("No candidate image found for article: %s", article_url)
+            _remember_miss(negative_cache, article_url, 'no_candidate')
             return None
 
         resolved_image_url = urljoin(article_url, resolved_image_url)
 
-        # Try HEAD to get content-type/length (some servers block HEAD; it's okay if it fails)
-        content_type = None
-        content_length = None
+        # Stream GET and write to temp file with size guard. The response
+        # headers arrive before the body, so type/size checks need no HEAD
         try:
-            head = session.head(resolved_image_url, allow_redirects=True, timeout=timeout)
-            if head.ok:
-                content_type = head.headers.get('content-type')
-                content_length = head.headers.get('content-length')
-        except Exception:
-            # ignore HEAD errors; we'll proceed with GET
-            content_type = None
-            content_length = None
-
-        # Reject non-image content-types (if known)
-        if content_type and not content_type.lower().startswith('image/'):
-            logger.warning("Head indicates non-image content-type=%s for %s", content_type, resolved_image_url)
+            response = _get(session, policy, resolved_image_url, stream=True, timeout=timeout, http_cache=http_cache)
+        except CrawlSkipped as e:
+            logger.info("Skipping image %s: %s", resolved_image_url, type(e).__name__)
             return None
+        with metrics.timed('image_download'), response as r:
+            r.raise_for_status()
 
-        # Determine extension preference: URL ext -> content-type -> fallback .jpg
-        ext = _ext_from_url(resolved_image_url) or _ext_from_content_type(content_type) or '.jpg'
-
-        # Prepare filenames
-        unique_name = uuid.uuid4().hex
-        filename = secure_filename(unique_name + ext)
-        tmp_filename = filename + '.part'
-        filepath_tmp = os.path.join(upload_folder, tmp_filename)
-        filepath_final = os.path.join(upload_folder, filename)
+            content_type = r.headers.get('content-type')
+            if content_type and not content_type.lower().startswith('image/'):
+                logger.warning("Downloaded resource content-type=%s is not image for %s", content_type, resolved_image_url)
+                _remember_miss(negative_cache, article_url, 'not_image')
+                return None
 
-        # If content-length present, check size
-        if content_length:
-            try:
-                if int(content_length) > max_size:
-                    logger.warning("Image content-length %s exceeds max_size %s for %s", content_length, max_size, resolved_image_url)
-                    return None
-            except ValueError:
-                pass
+            content_length = r.headers.get('content-length')
+            if content_length:
+                try:
+                    if int(content_length) > max_size:
+                        logger.warning("Image content-length %s exceeds max_size %s for %s", content_length, max_size, resolved_image_url)
+                        _remember_miss(negative_cache, article_url, 'too_large')
+                        return None
+                except ValueError:
+                    pass
 
-        # Stream GET and write to temp file with size guard
-        with session.get(resolved_image_url, stream=True, timeout=timeout) as r:
-            r.raise_for_status()
+            # Determine extension preference: URL ext -> content-type -> fallback .jpg
+            ext = _ext_from_url(resolved_image_url) or _ext_from_content_type(content_type) or '.jpg'
 
-            r_ct = r.headers.get('content-type')
-            if r_ct and not r_ct.lower().startswith('image/'):
-                logger.warning("Downloaded resource content-type=%s is not image for %s", r_ct, resolved_image_url)
-                return None
+            # Download under a unique temp name; the final name is the content hash
+            # (known only after streaming) so image URLs are immutable
+            tmp_filename = secure_filename(uuid.uuid4().hex + ext + '.part')
+            filepath_tmp = os.path.join(upload_folder, tmp_filename)
 
             total = 0
             chunk_size = 8192
+            digest = hashlib.sha256()
             with open(filepath_tmp, 'wb') as fh:
                 for chunk in r.iter_content(chunk_size=chunk_size):
                     if not chunk:
@@ -309,12 +342,14 @@ def download_image(article_url, image_url=None, upload_folder=None, session=None
                         except OSError:
                             pass
                         logger.warning("Download exceeded max_size during streaming (%d > %d): %s", total, max_size, resolved_image_url)
+                        _remember_miss(negative_cache, article_url, 'too_large')
                         return None
+                    digest.update(chunk)
                     fh.write(chunk)
 
         # Verify file is an image using Pillow
         try:
-            with Image.open(filepath_tmp) as img:
+            with metrics.timed('image_verify'), Image.open(filepath_tmp) as img:
                 img.verify()
         except (UnidentifiedImageError, OSError) as e:
             try:
@@ -322,8 +357,23 @@ def download_image(article_url, image_url=None, upload_folder=None, session=None
             except OSError:
                 pass
             logger.warning("Downloaded file is not a valid image (%s): %s", resolved_image_url, e)
+            _remember_miss(negative_cache, article_url, 'invalid_image')
             return None
 
+        filename = secure_filename(digest.hexdigest()[:32] + ext)
+        filepath_final = os.path.join(upload_folder, filename)
+
+        # Same bytes already stored under this name: keep the existing file,
+        # refreshing its mtime so retention's grace period covers the reuse
+        if os.path.exists(filepath_final):
+            try:
+                os.remove(filepath_tmp)
+                os.utime(filepath_final)
+            except OSError:
+                pass
+            logger.info("Image %s already stored for %s", filename, resolved_image_url)
+            return filename
+
         # Move .part to final filename
         try:
             os.replace(filepath_tmp, filepath_final)
@@ -338,17 +388,7 @@ def download_image(article_url, image_url=None, upload_folder=None, session=None
                     pass
                 return None
 
-        # Create thumbnail (safe open)
-        try:
-            with Image.open(filepath_final) as img:
-                img.thumbnail((300, 300))
-                thumb_name = f"thumb_{filename}"
-                thumb_path = os.path.join(upload_folder, thumb_name)
-                img.save(thumb_path)
-        except Exception as e:
-            logger.warning("Failed to create thumbnail for %s: %s", filepath_final, e)
-            # don't fail pipeline for thumbnail problems
-
+        metrics.incr('images_saved')
         logger.info("Saved image %s from %s", filename, resolved_image_url)
         return filename
 
@@ -360,33 +400,100 @@ def download_image(article_url, image_url=None, upload_folder=None, session=None
 # End of download_image helper
 # ---------------------------
 
-def generate_video_script(latest_edu_news):
-    prompt = f"""
+# ---------------------------
+# Responsive image variants
+# ---------------------------
+
+# Pillow save format for each variant format we know how to write
+_VARIANT_FORMATS = {
+    'webp': 'WEBP',
+    'avif': 'AVIF',
+}
+
+def _variant_format_supported(fmt):
+    if fmt == 'avif':
+        # AVIF needs the optional pillow-avif-plugin on Pillow < 11
+        try:
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+    Image.init()
+    return _VARIANT_FORMATS[fmt] in Image.SAVE
+
+def generate_image_variants(filename, upload_folder=None, widths=None, formats=None, quality=None):
+    """
+    Write downscaled copies of a saved image for use in srcset.
+    - filename: image previously saved by download_image()
+    - returns: list of {"file", "width", "format"} dicts (smallest first), [] on failure
+    """
+    if upload_folder is None:
+        upload_folder = getattr(Config, 'UPLOAD_FOLDER', None) or os.path.join(os.getcwd(), 'static', 'images')
+    widths = sorted(widths or getattr(Config, 'IMAGE_VARIANT_WIDTHS', [320, 640, 1024]))
+    formats = formats or getattr(Config, 'IMAGE_VARIANT_FORMATS', ['webp'])
+    quality = quality or getattr(Config, 'IMAGE_VARIANT_QUALITY', 75)
+
+    formats = [f for f in formats if f in _VARIANT_FORMATS and _variant_format_supported(f)]
+    if not formats:
+        logger.warning("No supported image variant formats available; skipping variants")
+        return []
+
+    source_path = os.path.join(upload_folder, filename)
+    stem = os.path.splitext(filename)[0]
+    variants = []
+    try:
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img)
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+
+            # Never upscale; an image narrower than every width gets one variant at its own size
+            target_widths = [w for w in widths if w < img.width] or [img.width]
+            for width in target_widths:
+                height = max(1, round(img.height * width / img.width))
+                resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS)
+                for fmt in formats:
+                    pil_format = _VARIANT_FORMATS[fmt]
+                    variant_name = f"{stem}_{width}w.{fmt}"
+                    resized.save(os.path.join(upload_folder, variant_name), pil_format, quality=quality)
+                    variants.append({'file': variant_name, 'width': width, 'format': fmt})
+    except Exception as e:
+        logger.warning("Failed to create image variants for %s: %s", source_path, e)
+        # don't fail pipeline for variant problems
+        return variants
+
+    return variants
+
+VIDEO_SCRIPT_PROMPT = """
 You are a professional Ghanaian news presenter creating a short,
 high-energy script
 for TikTok, Instagram Reels, and Facebook Reels.
 
 Here are the latest education news headlines and summaries:
-{format_news(latest_edu_news)} 
+{stories}
 
 Write an engaging, human-sounding short video script that hooks viewers in
 the first 3 seconds.
 Use a friendly but confident tone, keep sentences short and punchy. Keep
 it under 60 seconds.
 """
+
+def generate_video_script(latest_edu_news):
+    prompt = build_prompt(VIDEO_SCRIPT_PROMPT, latest_edu_news, call='video_script')
     try:
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
+        client = _get_genai()
+        client.configure(api_key=Config.GEMINI_API_KEY)
+        model = client.GenerativeModel("gemini-1.5-flash")
+        with metrics.timed('gemini', call='video_script'):
+            response = model.generate_content(prompt)
         return response.text
     except Exception as e:
+        metrics.incr('gemini_errors')
         logger.error(f"Error generating video script (Gemini): {e}")
         # fallback: simple assembled script
-        fallback = " | ".join([f"{i+1}. {n['title']}" for i, n in enumerate(latest_edu_news[:5])])
+        fallback = " | ".join([f"{i+1}. {n.title}" for i, n in enumerate(latest_edu_news[:5])])
         return f"Auto fallback: This week: {fallback}"
 
-def generate_unified_script(news_items):
-    prompt = f"""
+UNIFIED_SCRIPT_PROMPT = """
 YYou are a creative scriptwriter for TikTok news. 
 Write a short, human-sounding script about this week’s top education news in Ghana. 
 
@@ -407,109 +514,216 @@ Rules:
 - Write it like a TikTok creator speaking directly to their followers, not like a news anchor.
 
 Stories:
-{format_news(news_items)}
+{stories}
 """
+
+def generate_unified_script(news_items):
+    prompt = build_prompt(UNIFIED_SCRIPT_PROMPT, news_items, call='unified_script')
     try:
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
+        client = _get_genai()
+        client.configure(api_key=Config.GEMINI_API_KEY)
+        model = client.GenerativeModel("gemini-1.5-flash")
+        with metrics.timed('gemini', call='unified_script'):
+            response = model.generate_content(prompt)
         return response.text
     except Exception as e:
+        metrics.incr('gemini_errors')
         logger.error(f"Error generating unified script (Gemini): {e}")
         # fallback
-        fallback = " | ".join([f"{i+1}. {n['title']}" for i, n in enumerate(news_items[:7])])
+        fallback = " | ".join([f"{i+1}. {n.title}" for i, n in enumerate(news_items[:7])])
         return f"Auto fallback unified: {fallback}"
 
-def format_news(news_list):
-    return "\n".join(
-        f"- {item['title']} ({item['link']}) \n {item['summary']}"
-        for item in news_list
+def _download_item_image(link, policy=None, negative_cache=None, image_url=None, session=None):
+    """Download an article's image (scraped from the page unless image_url is given) and its variants. Returns (filename, variants)."""
+    image_filename = None
+    image_variants = None
+    if negative_cache is not None and link in negative_cache:
+        metrics.incr('image_miss_cached')
+        return image_filename, image_variants
+    try:
+        # without image_url, download_image scrapes the article page for one
+        image_filename = download_image(link, image_url=image_url, session=session, policy=policy,
+                                        negative_cache=negative_cache, http_cache=default_http_cache())
+        if image_filename:
+            with metrics.timed('image_variants'):
+                image_variants = generate_image_variants(image_filename)
+    except Exception as e:
+        logger.error(f"Image download failed for {link}: {e}")
+    return image_filename, image_variants
+
+def _build_news_item(news_item, image_filename, image_variants):
+    return NewsItem(
+        title=news_item.title, 
+        link=news_item.link, 
+        summary=news_item.summary, 
+        published=news_item.published or datetime.utcnow(), 
+        category='education', 
+        image_path=image_filename,
+        image_variants=image_variants
     )
 
+def _download_images(new_items):
+    """
+    Download each item's image and variants on SCRAPE_WORKERS threads.
+    Workers fetch different hosts in parallel; the crawl policy applies
+    robots.txt, paces requests to any one host and skips hosts whose
+    breaker is open; articles known to have no image aren't fetched again.
+    Returns: [(filename, variants)] aligned with new_items.
+    """
+    policy = CrawlPolicy()
+    policy.preload([n.link for n in new_items])
+    negative_cache = NegativeCache()
+    negative_cache.preload([n.link for n in new_items])
+    session = _make_crawl_session()
+    with session, ThreadPoolExecutor(max_workers=Config.SCRAPE_WORKERS) as pool:
+        images = list(pool.map(lambda n: _download_item_image(n.link, policy, negative_cache, session=session),
+                               new_items))
+    try:
+        policy.save(commit=False)
+        negative_cache.save(commit=False)
+        with metrics.timed('db_commit'):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to save crawl policies: {e}")
+    return images
+
 def run_news_pipeline():
     """
     Main pipeline. Runs under an app context.
     Returns: list of plain dicts
     """
-    # Clear old data first
-    if not clear_old_data():
-        logger.error("Failed to clear old data. Aborting pipeline.")
-        return []
+    # Archive anything past the retention window; this week's rows stay, so
+    # re-runs only download images for stories that are new since last time
+    try:
+        apply_retention()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Retention failed, continuing with the run: {e}")
 
     # ensure upload folder exists
     os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-    all_news = fetch_news()
-    this_week_news = filter_this_week(all_news)
-    edu_news = filter_education(this_week_news)
-    latest_edu_news = get_latest(edu_news, limit=10)
+
+    # With the job queue on, fetches/scrapes/scripts run as jobs that any
+    # `flask run-worker` process (and this run, while it waits) can take
+    batch = None
+    if Config.JOB_QUEUE_ENABLED:
+        from scripts import tasks  # imports this module
+        batch = new_batch()
+
+    # Refresh every feed (conditional GETs, so unchanged feeds are cheap), then
+    # read the week's entries from the staging table the poller fills
+    if batch:
+        tasks.refresh_feeds(batch, list(Config.RSS_FEEDS))
+    else:
+        poll_due_feeds(force=True)
+    today = datetime.utcnow().date()
+    start_of_week = datetime.combine(today - timedelta(days=today.weekday()), datetime.min.time())
+    all_news = load_staged_entries(since=start_of_week)
+    with metrics.timed('filter'):
+        this_week_news = filter_this_week(all_news)
+        edu_news = filter_education(dedupe_items(this_week_news))
+        latest_edu_news = get_latest(edu_news, limit=10)
     
     if not latest_edu_news:
         logger.info("No education news found for this week.")
+        if batch:
+            finish_batch(batch)
         return []
 
-    # Generate scripts
-    unified_script_content = generate_unified_script(latest_edu_news)
-    individual_script_content = generate_video_script(latest_edu_news)
-
-    # Save unified script to DB
-    today = datetime.utcnow().date()
-    week_start = today - timedelta(days=today.weekday())
-    unified = UnifiedScript(
-        content=unified_script_content,
-        week_start=datetime.combine(week_start, datetime.min.time())
-    )
-    db.session.add(unified)
-    db.session.commit()  # Commit early to avoid locking
+    # Avoid duplicates by link (one query for the whole batch)
+    links = [n.link for n in latest_edu_news]
+    existing_links = {
+        link for (link,) in db.session.query(NewsItem.link).filter(NewsItem.link.in_(links))
+    }
+    # The week's unified script, if an earlier run already wrote one
+    unified = UnifiedScript.query.filter(
+        UnifiedScript.week_start == start_of_week
+    ).order_by(UnifiedScript.created_at.desc(), UnifiedScript.id.desc()).first()
+    db.session.rollback()  # end the read transaction before the slow network work
 
-    results = []
+    new_items = []
     for news_item in latest_edu_news:
-        # Avoid duplicates by link
-        if NewsItem.query.filter_by(link=news_item['link']).first():
-            logger.info(f"Skipping duplicate: {news_item['title']}")
+        if news_item.link in existing_links:
+            logger.info(f"Skipping duplicate: {news_item.title}")
             continue
-
-        image_filename = None
-        try:
-            # call new download_image with just the article URL (the helper will scrape the page)
-            image_filename = download_image(news_item['link'])
-        except Exception as e:
-            logger.error(f"Image download failed for {news_item['link']}: {e}")
-
-        # parse published
-        try:
-            published_date = date_parser.parse(news_item['published'])
-        except Exception:
-            published_date = datetime.utcnow()
-
-        # create DB record
-        item = NewsItem(
-            title=news_item['title'], 
-            link=news_item['link'], 
-            summary=news_item['summary'], 
-            published=published_date, 
-            category='education', 
-            image_path=image_filename
-        )
+        existing_links.add(news_item.link)
+        new_items.append(news_item)
+
+    # A re-run in the same week reuses the week's unified script unless there
+    # are new stories; the per-item video script is only needed for new items
+    needed = []
+    if new_items or unified is None:
+        needed.append('unified')
+    if new_items:
+        needed.append('video')
+
+    # Generate scripts and download images before writing anything, so the
+    # write transaction below holds the SQLite lock only for the inserts
+    scripts = {}
+    images = []
+    if batch and needed:
+        scripts, images = tasks.generate_scripts_and_images(batch, latest_edu_news, new_items, needed)
+    elif needed:
+        if 'unified' in needed:
+            scripts['unified'] = generate_unified_script(latest_edu_news)
+        if 'video' in needed:
+            scripts['video'] = generate_video_script(latest_edu_news)
+        images = _download_images(new_items)
+
+    # Save the week's unified script (one row per week, replaced when the
+    # stories change), new items and their scripts in one transaction
+    if 'unified' in scripts:
+        duplicates = []
+        if unified is None:
+            unified = UnifiedScript(week_start=start_of_week)
+            db.session.add(unified)
+        else:
+            # Older runs inserted one row per run; keep only the newest
+            duplicates = UnifiedScript.query.filter(
+                UnifiedScript.week_start == start_of_week, UnifiedScript.id != unified.id
+            ).all()
+        for row in duplicates:
+            db.session.delete(row)
+        unified.content = scripts['unified']
+        unified.created_at = datetime.utcnow()
+
+    for news_item, (image_filename, image_variants) in zip(new_items, images):
+        item = _build_news_item(news_item, image_filename, image_variants)
         db.session.add(item)
-        db.session.flush()  # get id
 
         # Attach (same) weekly script reference
         script = SocialMediaScript(
-            content=individual_script_content, 
-            news_item_id=item.id
+            content=scripts['video'],
+            news_item=item
         )
         db.session.add(script)
-
+        metrics.incr('news_items_saved')
+
+    if scripts or new_items:
+        with metrics.timed('db_commit'):
+            db.session.commit()
+        bump_data_version()
+    if batch:
+        finish_batch(batch)
+
+    # The digest covers the week's stories, stored now or by an earlier run
+    unified_content = unified.content if unified is not None else None
+    stored = {item.link: item for item in NewsItem.query.filter(NewsItem.link.in_(links))}
+    results = []
+    for news_item in latest_edu_news:
+        item = stored.get(news_item.link)
+        if item is None:
+            continue
         results.append({
-            "title": news_item['title'], 
-            "summary": news_item['summary'], 
-            "link": news_item['link'], 
-            "image_path": image_filename, 
-            "created_at": datetime.utcnow().isoformat(), 
-            "script": unified_script_content
+            "title": item.title,
+            "summary": item.summary,
+            "link": item.link,
+            "image_path": item.image_path,
+            "created_at": item.created_at.isoformat() if item.created_at else None,
+            "script": unified_content
         })
-
-    db.session.commit()
+    db.session.rollback()
     return results
 
 if __name__ == "__main__":  
@@ -0,0 +1,138 @@
+from html import unescape
+from html.parser import HTMLParser
+from config import Config
+from app import metrics
+import re
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Summary cleaning and prompt packing
+# ---------------------------
+# Feed summaries arrive as HTML full of images, tracking links and repeated
+# boilerplate. clean_summary() reduces them to plain text once, when an entry
+# is ingested, so staging rows, NewsItems and prompts all hold the short
+# form. pack_stories() then fits the week's stories into a token budget
+# (PROMPT_TOKEN_BUDGET) using a cheap local estimate instead of a tokenizer.
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_SPACE_RE = re.compile(r'\s+')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_SKIP_TAGS = {'script', 'style', 'noscript', 'iframe', 'svg', 'figure', 'figcaption'}
+_BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'tr'}
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+def html_to_text(value):
+    """Visible text of an HTML fragment, whitespace collapsed."""
+    if not value:
+        return ''
+    if '<' not in value:
+        return _SPACE_RE.sub(' ', unescape(value)).strip()
+    parser = _TextExtractor()
+    try:
+        parser.feed(value)
+        parser.close()
+    except Exception:
+        # Malformed markup: fall back to dropping anything tag-shaped
+        return _SPACE_RE.sub(' ', unescape(re.sub(r'<[^>]*>', ' ', value))).strip()
+    return _SPACE_RE.sub(' ', ''.join(parser.parts)).strip()
+
+def dedupe_sentences(text):
+    """Drop sentences repeated verbatim (case/space-insensitive), keeping the first."""
+    seen = set()
+    kept = []
+    for sentence in _SENTENCE_RE.split(text):
+        key = sentence.strip().lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence.strip())
+    return ' '.join(kept)
+
+def clean_summary(value, max_chars=None):
+    """Plain-text summary: no markup, URLs or repeated sentences, capped at SUMMARY_MAX_CHARS."""
+    max_chars = max_chars or Config.SUMMARY_MAX_CHARS
+    text = dedupe_sentences(_URL_RE.sub('', html_to_text(value)))
+    text = _SPACE_RE.sub(' ', text).strip()
+    return truncate_text(text, max_chars)
+
+def truncate_text(text, max_chars):
+    """Cut at a sentence (or word) boundary at or before max_chars."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    end = max(cut.rfind('. '), cut.rfind('! '), cut.rfind('? '))
+    if end >= max_chars // 2:
+        return cut[:end + 1]
+    return cut.rsplit(' ', 1)[0].rstrip(',;:') + '…'
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+def _format_story(item, summary):
+    return f"- {item.title} ({item.link}) \n {summary}"
+
+def pack_stories(items, budget=None, story_tokens=None):
+    """
+    Format stories (already ranked, most important first) for a prompt,
+    within `budget` estimated tokens. Each summary is trimmed to
+    `story_tokens`; stories that don't fit are left out.
+    Returns: (text, {"stories", "dropped", "tokens"}).
+    """
+    budget = budget or Config.PROMPT_TOKEN_BUDGET
+    story_tokens = story_tokens or Config.PROMPT_STORY_TOKENS
+
+    lines = []
+    used = 0
+    for item in items:
+        line = _format_story(item, truncate_text(item.summary, story_tokens * 4))
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            if lines:
+                break
+            # Always include the top story, trimmed to whatever fits
+            line = truncate_text(line, max(budget * 4, 1))
+            cost = estimate_tokens(line)
+        lines.append(line)
+        used += cost
+    stats = {'stories': len(lines), 'dropped': len(items) - len(lines), 'tokens': used}
+    return "\n".join(lines), stats
+
+def build_prompt(template, items, call):
+    """
+    Fill `{stories}` in template with packed stories and record the prompt
+    size under the `call` label. Returns the prompt text.
+    """
+    stories, stats = pack_stories(items)
+    prompt = template.format(stories=stories)
+    tokens = estimate_tokens(prompt)
+    metrics.incr('prompt_tokens', tokens, call=call)
+    metrics.incr('prompt_chars', len(prompt), call=call)
+    if stats['dropped']:
+        metrics.incr('prompt_stories_dropped', stats['dropped'], call=call)
+    logger.info("%s prompt: %d stories (%d dropped), ~%d tokens", call, stats['stories'], stats['dropped'], tokens)
+    return prompt
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import selectinload
+from config import Config
+from app import db, metrics
+from app.cache import bump_data_version
+from app.models import NewsItem, SocialMediaScript, UnifiedScript
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Retention and archival
+# ---------------------------
+# The main tables keep the last RETENTION_WEEKS weeks (the dashboard's
+# window). Older rows are written to gzipped NDJSON segments under
+# ARCHIVE_FOLDER and then deleted, RETENTION_CHUNK_SIZE rows at a time with
+# one short transaction per chunk, so web requests and the pipeline are
+# never locked out for long. Segment names come from the id range they
+# hold, so a chunk that is archived but not yet deleted (crash in between)
+# is rewritten identically on the next run. Images no longer referenced by
+# any NewsItem are deleted afterwards, in batches.
+
+# Names the pipeline gives the images it downloads: the first 32 hex digits
+# of the content's SHA-256 plus an extension, and "<stem>_<width>w.<fmt>"
+# for their variants. Nothing else in the image folder is ever deleted.
+_IMAGE_NAME_RE = re.compile(r'^([0-9a-f]{32})(_\d+w)?\.[a-z0-9]+$')
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _serialize_news_item(item):
+    return {
+        'id': item.id,
+        'title': item.title,
+        'link': item.link,
+        'summary': item.summary,
+        'published': _iso(item.published),
+        'category': item.category,
+        'image_path': item.image_path,
+        'image_variants': item.image_variants,
+        'created_at': _iso(item.created_at),
+        'scripts': [
+            {'id': s.id, 'content': s.content, 'created_at': _iso(s.created_at)}
+            for s in item.scripts
+        ],
+    }
+
+def _serialize_unified_script(script):
+    return {
+        'id': script.id,
+        'content': script.content,
+        'week_start': _iso(script.week_start),
+        'created_at': _iso(script.created_at),
+    }
+
+def write_segment(kind, records, archive_folder=None):
+    """Atomically write records as <kind>-<first id>-<last id>.ndjson.gz. Returns the path."""
+    archive_folder = archive_folder or Config.ARCHIVE_FOLDER
+    os.makedirs(archive_folder, exist_ok=True)
+    name = f"{kind}-{records[0]['id']:010d}-{records[-1]['id']:010d}.ndjson.gz"
+    path = os.path.join(archive_folder, name)
+    tmp_path = path + '.part'
+    archived_at = datetime.utcnow().isoformat()
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as fh:
+        for record in records:
+            fh.write(json.dumps(dict(record, archived_at=archived_at), ensure_ascii=False))
+            fh.write('\n')
+    os.replace(tmp_path, path)
+    return path
+
+def _archive_chunk(kind, query, serialize, delete):
+    """Archive and delete one chunk. Returns the number of rows moved."""
+    rows = query.limit(Config.RETENTION_CHUNK_SIZE).all()
+    if not rows:
+        return 0
+    records = [serialize(row) for row in rows]
+    ids = [record['id'] for record in records]
+    db.session.rollback()  # release the read snapshot before writing the segment
+
+    path = write_segment(kind, records)
+    delete(ids)
+    with metrics.timed('db_commit'):
+        db.session.commit()
+    metrics.incr('rows_archived', len(ids), table=kind)
+    logger.info("Archived %d %s rows to %s", len(ids), kind, path)
+    return len(ids)
+
+def _delete_news_items(ids):
+    SocialMediaScript.query.filter(SocialMediaScript.news_item_id.in_(ids)).delete(synchronize_session=False)
+    NewsItem.query.filter(NewsItem.id.in_(ids)).delete(synchronize_session=False)
+
+def _delete_unified_scripts(ids):
+    UnifiedScript.query.filter(UnifiedScript.id.in_(ids)).delete(synchronize_session=False)
+
+def archive_old_rows(cutoff):
+    """Move NewsItems (with their scripts) and UnifiedScripts older than cutoff into the archive."""
+    news_query = NewsItem.query.options(selectinload(NewsItem.scripts)).filter(
+        NewsItem.created_at < cutoff
+    ).order_by(NewsItem.id)
+    unified_query = UnifiedScript.query.filter(
+        UnifiedScript.week_start < cutoff
+    ).order_by(UnifiedScript.id)
+
+    moved = 0
+    for kind, query, serialize, delete in (
+        ('news_item', news_query, _serialize_news_item, _delete_news_items),
+        ('unified_script', unified_query, _serialize_unified_script, _delete_unified_scripts),
+    ):
+        while True:
+            count = _archive_chunk(kind, query, serialize, delete)
+            moved += count
+            if count < Config.RETENTION_CHUNK_SIZE:
+                break
+            time.sleep(Config.RETENTION_CHUNK_PAUSE)  # let other writers in between chunks
+    return moved
+
+def referenced_images():
+    """Every image file name still used by a NewsItem, originals and variants."""
+    names = set()
+    rows = db.session.query(NewsItem.image_path, NewsItem.image_variants).filter(
+        NewsItem.image_path.isnot(None)
+    ).yield_per(500)
+    for image_path, variants in rows:
+        names.add(image_path)
+        names.update(v['file'] for v in (variants or []) if v.get('file'))
+    db.session.rollback()
+    return names
+
+def _pipeline_image(entry):
+    match = _IMAGE_NAME_RE.match(entry.name)
+    if match is None:
+        return False
+    if match.group(2):
+        return True
+    # Bundled static images have uuid4 names of the same shape: an original
+    # counts only if its name really is its content hash
+    digest = hashlib.sha256()
+    with open(entry.path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32] == match.group(1)
+
+def delete_orphaned_images(upload_folder=None):
+    """
+    Delete images the pipeline downloaded (and their variants) that no
+    NewsItem references; other files in the folder are left alone. Files
+    younger than RETENTION_IMAGE_GRACE_SECONDS are kept, since a running
+    pipeline saves images before committing the rows that point at them.
+    Returns: number of files deleted.
+    """
+    upload_folder = upload_folder or Config.UPLOAD_FOLDER
+    if not upload_folder or not os.path.isdir(upload_folder):
+        return 0
+
+    keep = referenced_images()
+    grace_cutoff = time.time() - Config.RETENTION_IMAGE_GRACE_SECONDS
+    deleted = 0
+    with os.scandir(upload_folder) as it:
+        for entry in it:
+            if entry.name in keep or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat().st_mtime > grace_cutoff or not _pipeline_image(entry):
+                    continue
+                os.unlink(entry.path)
+                deleted += 1
+            except OSError as e:
+                logger.error("Failed to delete %s. Reason: %s", entry.path, e)
+                continue
+            if deleted % Config.RETENTION_IMAGE_BATCH == 0:
+                logger.info("Deleted %d orphaned images so far", deleted)
+                time.sleep(Config.RETENTION_CHUNK_PAUSE)
+
+    metrics.incr('images_deleted', deleted)
+    if deleted:
+        logger.info("Deleted %d orphaned images from %s", deleted, upload_folder)
+    return deleted
+
+def apply_retention(now=None):
+    """
+    Archive rows older than RETENTION_WEEKS and delete orphaned images.
+    Runs under an app context. Returns: {"rows_archived", "images_deleted"}.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(weeks=Config.RETENTION_WEEKS)
+    with metrics.timed('retention'):
+        moved = archive_old_rows(cutoff)
+        images = delete_orphaned_images()
+    if moved or images:
+        bump_data_version()
+    return {'rows_archived': moved, 'images_deleted': images}
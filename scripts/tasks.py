@@ -0,0 +1,157 @@
+from datetime import datetime
+from urllib.parse import urljoin
+from config import Config
+from app import db, metrics
+from scripts.job_queue import enqueue, wait_for_batch, batch_results
+from scripts.feed_poller import poll_feeds, prune_staged_entries
+from scripts.feed_reader import FeedItem
+from scripts.crawl_policy import CrawlPolicy, CrawlSkipped, NegativeCache
+from scripts.http_cache import default_http_cache
+from scripts.news_scraper import (
+    scrape_article_image, _download_item_image, _make_crawl_session, generate_unified_script,
+    generate_video_script,
+)
+import threading
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Job handlers and pipeline fan-out
+# ---------------------------
+# A queued run looks like this: one `fetch` job per JOB_FETCH_BATCH_SIZE
+# feeds; then, once the week's stories are picked, two `script` jobs (queued
+# first, as Gemini is the slowest step) and a `scrape` job per new story.
+# A scrape that finds an image queues the `image` job for it. Handlers take
+# the ClaimedJob and return a JSON-able result; anything they add to the
+# session is committed together with the job's completion.
+
+# One crawl policy, negative cache and HTTP session per process. Each job
+# re-reads the stored policy of the host it fetches (other workers may have
+# opened its breaker), reserves request slots shared with every worker and
+# merges its counts back when it's done
+_crawl_state = None
+_crawl_lock = threading.Lock()
+
+def _crawl():
+    global _crawl_state
+    with _crawl_lock:
+        if _crawl_state is None:
+            _crawl_state = (CrawlPolicy(shared_pacing=True), NegativeCache(), _make_crawl_session())
+        return _crawl_state
+
+def _save_crawl(policy, negative_cache):
+    policy.save(commit=False)
+    negative_cache.save(commit=False)
+
+def fetch_task(job):
+    return {'new_entries': poll_feeds(job.payload['feed_urls'])}
+
+def scrape_task(job):
+    link = job.payload['link']
+    policy, negative_cache, session = _crawl()
+    policy.preload([link], refresh=True)
+    negative_cache.preload([link])
+    if link in negative_cache:
+        metrics.incr('image_miss_cached')
+        return {'image_url': None}
+
+    image_url = None
+    try:
+        image_url = scrape_article_image(link, session=session, policy=policy, http_cache=default_http_cache())
+        if image_url:
+            image_url = urljoin(link, image_url)
+            enqueue('image', {'link': link, 'image_url': image_url}, batch=job.batch, commit=False)
+        else:
+            logger.info("No candidate image found for article: %s", link)
+            negative_cache.add(link, 'no_candidate')
+    except CrawlSkipped as e:
+        logger.info("Skipping article %s: %s", link, type(e).__name__)
+    except Exception as e:
+        # Same as the in-process path: no image this run, no retry
+        logger.warning("Failed to fetch article page for image scraping: %s. Error: %s", link, e)
+    _save_crawl(policy, negative_cache)
+    return {'image_url': image_url}
+
+def image_task(job):
+    link, image_url = job.payload['link'], job.payload['image_url']
+    policy, negative_cache, session = _crawl()
+    policy.preload([image_url], refresh=True)
+    image_filename, image_variants = _download_item_image(link, policy, negative_cache, image_url=image_url,
+                                                          session=session)
+    _save_crawl(policy, negative_cache)
+    return {'image_path': image_filename, 'image_variants': image_variants}
+
+def _story(item):
+    return {
+        'title': item.title,
+        'link': item.link,
+        'summary': item.summary,
+        'published': item.published.isoformat() if item.published else None,
+    }
+
+def _feed_item(story):
+    published = datetime.fromisoformat(story['published']) if story['published'] else None
+    return FeedItem(story['title'], story['link'], story['summary'], published)
+
+SCRIPT_GENERATORS = {
+    'unified': generate_unified_script,
+    'video': generate_video_script,
+}
+
+def script_task(job):
+    stories = [_feed_item(s) for s in job.payload['stories']]
+    return {'content': SCRIPT_GENERATORS[job.payload['script']](stories)}
+
+HANDLERS = {
+    'fetch': fetch_task,
+    'scrape': scrape_task,
+    'image': image_task,
+    'script': script_task,
+}
+
+def _add_worker_counters(*results):
+    # Counters of jobs worked by other processes come back with their results
+    totals = {}
+    for rows in results:
+        for _, result in rows:
+            for name, value in (result or {}).get('counters', {}).items():
+                totals[name] = totals.get(name, 0) + value
+    metrics.add_to_run(totals)
+
+def refresh_feeds(batch, feed_urls):
+    """Queue fetch jobs for every feed, wait for them, then prune staging. Returns new entry count."""
+    size = Config.JOB_FETCH_BATCH_SIZE
+    for start in range(0, len(feed_urls), size):
+        enqueue('fetch', {'feed_urls': feed_urls[start:start + size]}, batch=batch, commit=False)
+    db.session.commit()
+    wait_for_batch(batch)
+    prune_staged_entries()
+    results = batch_results(batch, 'fetch')
+    _add_worker_counters(results)
+    return sum((result or {}).get('new_entries', 0) for _, result in results)
+
+def generate_scripts_and_images(batch, stories, new_items, scripts=tuple(SCRIPT_GENERATORS)):
+    """
+    Queue a job for each named script and a scrape job per new story, and wait.
+    Returns: ({name: script}, [(filename, variants)] aligned with new_items).
+    A script job that didn't finish is generated here instead.
+    """
+    payload = [_story(item) for item in stories]
+    for name in scripts:
+        enqueue('script', {'script': name, 'stories': payload}, batch=batch, commit=False)
+    for item in new_items:
+        enqueue('scrape', {'link': item.link}, batch=batch, commit=False)
+    db.session.commit()
+    wait_for_batch(batch)
+
+    script_results, image_results = batch_results(batch, 'script'), batch_results(batch, 'image')
+    _add_worker_counters(script_results, batch_results(batch, 'scrape'), image_results)
+    generated = {p['script']: r['content'] for p, r in script_results if r}
+    images = {p['link']: (r['image_path'], r['image_variants']) for p, r in image_results if r}
+    for name in scripts:
+        if name not in generated:
+            logger.warning("%s script job did not finish; generating it in the run", name)
+            generated[name] = SCRIPT_GENERATORS[name](stories)
+    return generated, [images.get(item.link, (None, None)) for item in new_items]
@@ -1,6 +1,8 @@
 import requests
 import os
+from html import escape
 from config import Config
+from app import metrics
 
 def send_telegram_message(text, chat_id=None, token=None):
     if not chat_id:
@@ -8,7 +10,7 @@ def send_telegram_message(text, chat_id=None, token=None):
     if not token:
         token = Config.TELEGRAM_BOT_TOKEN
     
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    url = f"{Config.TELEGRAM_API_URL}/bot{token}/sendMessage"
     payload = {
         'chat_id': chat_id,
         'text': text,
@@ -16,10 +18,12 @@ def send_telegram_message(text, chat_id=None, token=None):
     }
     
     try:
-        response = requests.post(url, data=payload, timeout=10)
+        with metrics.timed('telegram_send', kind='message'):
+            response = requests.post(url, data=payload, timeout=10)
         response.raise_for_status()
         return True
     except Exception as e:
+        metrics.incr('telegram_failures')
         print(f"Error sending Telegram message: {e}")
         return False
 
@@ -29,7 +33,7 @@ def send_telegram_photo(image_path, caption="", chat_id=None, token=None):
     if not token:
         token = Config.TELEGRAM_BOT_TOKEN
     
-    url = f"https://api.telegram.org/bot{token}/sendPhoto"
+    url = f"{Config.TELEGRAM_API_URL}/bot{token}/sendPhoto"
     
     if not os.path.exists(image_path):
         print(f"Image file not found: {image_path}")
@@ -39,10 +43,12 @@ def send_telegram_photo(image_path, caption="", chat_id=None, token=None):
         with open(image_path, 'rb') as photo:
             files = {'photo': photo}
             data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'HTML'}
-            response = requests.post(url, files=files, data=data, timeout=20)
+            with metrics.timed('telegram_send', kind='photo'):
+                response = requests.post(url, files=files, data=data, timeout=20)
             response.raise_for_status()
             return True
     except Exception as e:
+        metrics.incr('telegram_failures')
         print(f"Error sending Telegram photo: {e}")
         return False
 
@@ -71,7 +77,8 @@ def send_weekly_digest(news_items):
         link = n.get("link", "")
         img = n.get("image_path", None)
 
-        caption = f"<b>{title}</b>\n\n{summary}\n\nRead more: {link}"
+        # Summaries are plain text (see prompt_builder.clean_summary); escape for parse_mode=HTML
+        caption = f"<b>{escape(title, quote=False)}</b>\n\n{escape(summary, quote=False)}\n\nRead more: {escape(link)}"
 
         if img:
             path = os.path.join(Config.UPLOAD_FOLDER, img)
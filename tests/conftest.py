@@ -0,0 +1,55 @@
+"""
+Shared fixtures. Most of the pipeline reads Config directly rather than
+app.config, so paths and the database are pointed at a temp folder on the
+Config class itself for the duration of each test.
+"""
+import pytest
+
+from config import Config
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path / 'images'))
+    monkeypatch.setattr(Config, 'DATA_VERSION_FILE', str(tmp_path / 'data_version'))
+    monkeypatch.setattr(Config, 'HTTP_CACHE_FOLDER', str(tmp_path / 'http_cache'))
+    monkeypatch.setattr(Config, 'ARCHIVE_FOLDER', str(tmp_path / 'archive'))
+    monkeypatch.setattr(Config, 'CRAWL_DEFAULT_DELAY', 0)
+    return Config
+
+
+@pytest.fixture
+def app(config):
+    """An app with a fresh SQLite database; the test body runs inside its app context."""
+    from app import create_app, db, response_cache
+
+    app = create_app(config)
+    app.config['TESTING'] = True
+    response_cache.clear()  # process-wide, so it would outlive the test's database
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def logged_in(app, client):
+    """The test client with a user logged in."""
+    from app import db
+    from app.models import User
+
+    user = User(username='tester', email='tester@example.com')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+    return client
@@ -0,0 +1,52 @@
+import multiprocessing
+from datetime import datetime, timedelta
+
+import app.cache as cache
+from app.cache import bump_data_version, get_data_version
+
+
+def test_data_version_starts_at_zero_and_bumps(config):
+    assert get_data_version() == 0
+    assert bump_data_version() == 1
+    assert bump_data_version() == 2
+    assert get_data_version() == 2
+
+
+def _bump_many(count):
+    for _ in range(count):
+        bump_data_version()
+
+
+def test_concurrent_bumps_are_not_lost(config):
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_bump_many, args=(50,)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert get_data_version() == 200
+
+
+def test_status_is_cached_until_the_data_version_changes(logged_in):
+    first = logged_in.get('/api/status')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert logged_in.get('/api/status').headers['X-Cache'] == 'HIT'
+
+    revalidated = logged_in.get('/api/status', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    bump_data_version()
+    assert logged_in.get('/api/status').headers['X-Cache'] == 'MISS'
+
+
+def test_cached_pages_expire_with_the_date(logged_in, monkeypatch):
+    assert logged_in.get('/api/status').headers['X-Cache'] == 'MISS'
+
+    class Tomorrow(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=1)
+
+    monkeypatch.setattr(cache, 'datetime', Tomorrow)
+    assert logged_in.get('/api/status').headers['X-Cache'] == 'MISS'
+    assert logged_in.get('/api/status').headers['X-Cache'] == 'HIT'
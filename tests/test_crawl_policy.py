@@ -0,0 +1,165 @@
+import io
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+from app import db
+from app.models import HostPolicy
+from scripts.crawl_policy import (
+    BREAKER_CLOSED, BREAKER_OPEN, CrawlDisallowed, CrawlPolicy, HostUnavailable, host_of,
+)
+
+ROBOTS = """
+User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+"""
+
+
+class FakeSession:
+    """Answers robots.txt requests with a fixed status and body; records every URL asked for."""
+
+    def __init__(self, status=200, text=ROBOTS):
+        self.status = status
+        self.text = text
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        if self.status is None:
+            raise requests.ConnectionError('unreachable')
+        resp = requests.Response()
+        resp.status_code = self.status
+        resp.encoding = 'utf-8'
+        resp.raw = HTTPResponse(body=io.BytesIO(self.text.encode()), preload_content=False)
+        return resp
+
+    def request(self, method, url, **kwargs):
+        self.requested.append(url)
+        resp = requests.Response()
+        resp.status_code = 200
+        return resp
+
+
+def test_host_of_keeps_the_port_and_drops_credentials():
+    assert host_of('https://user:pw@Example.com:8443/a?b') == ('example.com:8443', 'https')
+    assert host_of('//cdn.example/x.jpg') == ('cdn.example', 'https')
+
+
+def test_robots_rules_and_crawl_delay(app):
+    session = FakeSession()
+    policy = CrawlPolicy(session=session)
+    assert policy.allowed('https://news.example/story')
+    assert not policy.allowed('https://news.example/private/story')
+    assert session.requested == ['https://news.example/robots.txt']
+    assert policy.delay_for(policy._state('news.example')) == 2
+
+
+@pytest.mark.parametrize('status, allowed', [(404, True), (403, True), (503, False), (None, False)])
+def test_robots_fetch_outcomes(app, status, allowed):
+    # RFC 9309: a 4xx means no rules; 5xx or unreachable means disallow everything for now
+    policy = CrawlPolicy(session=FakeSession(status=status, text=''))
+    assert policy.allowed('https://news.example/story') is allowed
+
+
+def test_request_honours_robots(app):
+    session = FakeSession()
+    policy = CrawlPolicy(session=session)
+    with pytest.raises(CrawlDisallowed):
+        policy.request(session, 'GET', 'https://news.example/private/x')
+    assert policy.request(session, 'GET', 'https://news.example/ok').status_code == 200
+
+
+def test_breaker_opens_after_consecutive_failures(app, config):
+    session = FakeSession()
+    policy = CrawlPolicy(session=session)
+    url = 'https://flaky.example/a'
+    for _ in range(config.BREAKER_THRESHOLD):
+        assert policy.available(url)
+        policy.record(url, 503)
+    assert not policy.available(url)
+    with pytest.raises(HostUnavailable):
+        policy.request(session, 'GET', url)
+
+    # Once the cooldown has passed, one probe goes through and a success closes the breaker
+    state = policy._state('flaky.example')
+    state.breaker_until = datetime.utcnow() - timedelta(seconds=1)
+    assert policy.available(url)
+    assert not policy.available(url)
+    policy.record(url, 200)
+    assert state.breaker_state == BREAKER_CLOSED
+
+
+def _stored(host, **values):
+    row = HostPolicy(host=host, **values)
+    db.session.add(row)
+    db.session.commit()
+    return row
+
+
+def test_hosts_met_mid_run_use_their_stored_policy(app):
+    # e.g. an image CDN: never preloaded, first seen from a scraper thread
+    _stored('cdn.example', robots_status=404, robots_expires_at=datetime.utcnow() + timedelta(days=1),
+            breaker_state=BREAKER_OPEN, consecutive_failures=3,
+            breaker_until=datetime.utcnow() + timedelta(hours=1))
+    session = FakeSession()
+    policy = CrawlPolicy(session=session)
+    seen = {}
+    thread = threading.Thread(target=lambda: seen.update(
+        available=policy.available('https://cdn.example/a.jpg'),
+        allowed=policy.allowed('https://cdn.example/a.jpg')))
+    thread.start()
+    thread.join()
+    assert seen == {'available': False, 'allowed': True}
+    assert session.requested == []  # robots.txt came from the row
+
+
+def test_save_merges_with_the_stored_row(app):
+    _stored('news.example', request_count=10, error_count=2)
+    first, second = CrawlPolicy(session=FakeSession()), CrawlPolicy(session=FakeSession())
+    for policy, status in ((first, 200), (second, 503)):
+        policy.preload(['https://news.example/'])
+        policy.allowed('https://news.example/a')  # fetches robots.txt
+        policy.record('https://news.example/a', status)
+    first.save()
+    second.save()
+
+    row = HostPolicy.query.filter_by(host='news.example').one()
+    assert row.request_count == 12
+    assert row.error_count == 3
+    # The most recent request (second's failure) decides the health fields
+    assert row.consecutive_failures == 1
+    assert row.robots_txt == ROBOTS
+
+    # Saving again adds nothing twice
+    first.record('https://news.example/a', 200)
+    first.save()
+    assert HostPolicy.query.filter_by(host='news.example').one().request_count == 13
+
+
+def test_shared_pacing_hands_out_distinct_slots(app):
+    # Two workers' policies: the second has to wait out the first one's crawl delay
+    first, second = CrawlPolicy(shared_pacing=True), CrawlPolicy(shared_pacing=True)
+    assert first._reserve_slot('news.example', 0, 10) == 0
+    assert second._reserve_slot('news.example', 0, 10) == pytest.approx(10, abs=1)
+    assert first._reserve_slot('news.example', 0, 10) == pytest.approx(20, abs=1)
+    assert HostPolicy.query.filter_by(host='news.example').one().next_request_at > datetime.utcnow()
+
+
+def test_refresh_picks_up_breakers_opened_elsewhere(app, config):
+    url = 'https://flaky.example/a'
+    worker, other = CrawlPolicy(session=FakeSession()), CrawlPolicy(session=FakeSession())
+    worker.preload([url])
+    assert worker.available(url)
+
+    for _ in range(config.BREAKER_THRESHOLD):
+        other.record(url, 503)
+    other.save()
+
+    worker.preload([url])
+    assert worker.available(url)  # already loaded: not re-read
+    worker.preload([url], refresh=True)
+    assert not worker.available(url)
@@ -0,0 +1,104 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import NewsItem, SocialMediaScript, UnifiedScript
+
+
+@pytest.fixture
+def news(app):
+    items = [
+        NewsItem(title='Monday', link='https://news.example/1', category='education',
+                 created_at=datetime(2026, 10, 12, 9),
+                 image_variants=[{'file': 'a-320.webp', 'width': 320, 'format': 'webp'}]),
+        NewsItem(title='Wednesday', link='https://news.example/2', category='education',
+                 created_at=datetime(2026, 10, 14, 23, 59)),
+        NewsItem(title='Thursday', link='https://news.example/3', category='policy',
+                 created_at=datetime(2026, 10, 15, 0, 0)),
+    ]
+    db.session.add_all(items)
+    db.session.flush()
+    db.session.add(SocialMediaScript(content='Script', news_item_id=items[0].id))
+    db.session.add(UnifiedScript(content='Digest', week_start=datetime(2026, 10, 12)))
+    db.session.commit()
+    return items
+
+
+def _rows(resp):
+    return [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+
+def _titles(resp):
+    return [row['title'] for row in _rows(resp)]
+
+
+def test_needs_a_login_or_the_token(app, client, news):
+    assert client.get('/api/export/news').status_code == 401
+    app.config['EXPORT_TOKEN'] = 'export-me'
+    assert client.get('/api/export/news', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    resp = client.get('/api/export/news', headers={'Authorization': 'Bearer export-me'})
+    assert resp.status_code == 200
+    assert _titles(resp) == ['Monday', 'Wednesday', 'Thursday']
+
+
+def test_exports_ndjson(logged_in, news):
+    resp = logged_in.get('/api/export/news')
+    assert resp.mimetype == 'application/x-ndjson'
+    assert resp.headers['Cache-Control'] == 'private, no-store'
+    first = _rows(resp)[0]
+    assert first['created_at'] == '2026-10-12T09:00:00'
+    assert first['image_variants'] == [{'file': 'a-320.webp', 'width': 320, 'format': 'webp'}]
+
+
+def test_bare_date_until_includes_that_day(logged_in, news):
+    assert _titles(logged_in.get('/api/export/news?since=2026-10-13&until=2026-10-14')) == ['Wednesday']
+    assert _titles(logged_in.get('/api/export/news?until=2026-10-14T23:59:00')) == ['Monday']
+    # Offsets are converted to UTC
+    assert _titles(logged_in.get('/api/export/news?since=2026-10-15T02:00:00%2B02:00')) == ['Thursday']
+
+
+@pytest.mark.parametrize('query', ['since=last-week', 'until=2026-13-01', 'since=2026-10-12&until=soon'])
+def test_bad_bounds_are_rejected(logged_in, news, query):
+    assert logged_in.get(f'/api/export/news?{query}').status_code == 400
+
+
+def test_category_filter(logged_in, news):
+    assert _titles(logged_in.get('/api/export/news?category=education')) == ['Monday', 'Wednesday']
+    scripts = _rows(logged_in.get('/api/export/scripts?category=education'))
+    assert [(s['content'], s['news_title']) for s in scripts] == [('Script', 'Monday')]
+    assert _rows(logged_in.get('/api/export/scripts?category=policy')) == []
+
+
+def test_unified_scripts_have_no_category(logged_in, news):
+    assert logged_in.get('/api/export/unified-scripts?category=education').status_code == 400
+    assert [r['content'] for r in _rows(logged_in.get('/api/export/unified-scripts'))] == ['Digest']
+
+
+def test_unknown_dataset_and_format(logged_in, news):
+    assert logged_in.get('/api/export/users').status_code == 404
+    assert logged_in.get('/api/export/news?format=xml').status_code == 400
+
+
+def test_exports_csv_with_json_encoded_variants(logged_in, news):
+    resp = logged_in.get('/api/export/news?format=csv')
+    assert resp.mimetype == 'text/csv'
+    assert resp.headers['Content-Disposition'].endswith('.csv"')
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [r['title'] for r in rows] == ['Monday', 'Wednesday', 'Thursday']
+    assert json.loads(rows[0]['image_variants']) == [{'file': 'a-320.webp', 'width': 320, 'format': 'webp'}]
+    assert rows[1]['image_variants'] == ''
+
+
+def test_gzips_when_asked(logged_in, news):
+    plain = logged_in.get('/api/export/news')
+    assert 'Content-Encoding' not in plain.headers
+
+    resp = logged_in.get('/api/export/news', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(resp.get_data()) == plain.get_data()
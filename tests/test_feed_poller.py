@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from config import Config
+from scripts.feed_poller import estimate_publish_interval, next_poll_interval
+
+
+def _state(publish_interval=None, error_count=0, unchanged_count=0):
+    return SimpleNamespace(publish_interval=publish_interval, error_count=error_count,
+                           unchanged_count=unchanged_count)
+
+
+def test_polls_twice_per_publish_interval():
+    assert next_poll_interval(_state(publish_interval=2 * 60 * 60)) == 60 * 60
+
+
+def test_interval_is_clamped():
+    assert next_poll_interval(_state(publish_interval=60)) == Config.FEED_POLL_MIN_INTERVAL
+    assert next_poll_interval(_state(publish_interval=7 * 24 * 60 * 60)) == Config.FEED_POLL_MAX_INTERVAL
+    # Unknown publish rate: assume it's the ceiling
+    assert next_poll_interval(_state()) == Config.FEED_POLL_MAX_INTERVAL // 2
+
+
+def test_backs_off_while_nothing_changes():
+    intervals = [next_poll_interval(_state(publish_interval=60 * 60, unchanged_count=n)) for n in range(4)]
+    assert intervals == sorted(intervals)
+    assert intervals[1] == int(30 * 60 * Config.FEED_POLL_UNCHANGED_BACKOFF)
+    assert next_poll_interval(_state(publish_interval=60 * 60, unchanged_count=50)) == Config.FEED_POLL_MAX_INTERVAL
+
+
+def test_errors_back_off_exponentially_past_the_ceiling():
+    assert next_poll_interval(_state(error_count=1)) == Config.FEED_POLL_MIN_INTERVAL * 2
+    assert next_poll_interval(_state(error_count=3)) == Config.FEED_POLL_MIN_INTERVAL * 8
+    assert next_poll_interval(_state(error_count=30)) == Config.FEED_POLL_MAX_BACKOFF
+
+
+def test_publish_interval_is_the_median_gap_smoothed():
+    now = datetime(2026, 10, 19, 12)
+    times = [now - timedelta(hours=h) for h in (0, 1, 2, 4)]
+    assert estimate_publish_interval(times) == 60 * 60
+    assert estimate_publish_interval(times, previous=3 * 60 * 60) == 2 * 60 * 60
+    assert estimate_publish_interval([now, None], previous=123) == 123
@@ -0,0 +1,130 @@
+import gzip
+import io
+from datetime import datetime
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
+from scripts.feed_reader import FeedTooLarge, read_feed
+
+
+def _rss(n, tail='</channel></rss>'):
+    items = ''.join(
+        f'<item><title>Story {i}</title><link>https://news.example/{i}</link>'
+        f'<description>&lt;p&gt;Summary {i}&lt;/p&gt;</description>'
+        f'<pubDate>Mon, 19 Oct 2026 0{i % 10}:00:00 GMT</pubDate></item>'
+        for i in range(n)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed</title>{items}{tail}'.encode()
+
+
+class FakeFeed:
+    """Stands in for the network: serves `body` with `headers` (gzipped on request), 304s a matching ETag."""
+
+    def __init__(self, body, status=200, gzipped=False, **headers):
+        self.body = gzip.compress(body) if gzipped else body
+        self.status = status
+        self.headers = dict(headers, **({'Content-Encoding': 'gzip'} if gzipped else {}))
+        self.sent = None
+        self.stream = None
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.sent = headers
+        self.stream = io.BytesIO(self.body)
+        resp = requests.Response()
+        resp.url = url
+        etag = self.headers.get('ETag')
+        resp.status_code = 304 if etag and headers.get('If-None-Match') == etag else self.status
+        resp.headers = CaseInsensitiveDict(self.headers)
+        resp.raw = HTTPResponse(body=self.stream, headers=self.headers, preload_content=False)
+        return resp
+
+
+def test_reads_rss_entries():
+    result = read_feed('https://news.example/rss', session=FakeFeed(_rss(3)))
+    assert result.status == 200 and not result.truncated
+    assert [e.link for e in result.entries] == [f'https://news.example/{i}' for i in range(3)]
+    assert result.entries[0].summary == 'Summary 0'
+    assert result.entries[1].published == datetime(2026, 10, 19, 1)
+
+
+def test_reads_atom_alternate_links():
+    body = b'''<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">
+        <entry><title>One</title>
+            <link rel="self" href="https://news.example/api/1"/>
+            <link href="https://news.example/1"/>
+            <summary>First</summary><updated>2026-10-19T08:00:00+02:00</updated></entry>
+        <entry><title>Two</title>
+            <link rel="alternate" href="https://news.example/2"/>
+            <published>2026-10-18T08:00:00Z</published></entry>
+    </feed>'''
+    entries = read_feed('https://news.example/atom', session=FakeFeed(body)).entries
+    assert [e.link for e in entries] == ['https://news.example/1', 'https://news.example/2']
+    assert entries[0].published == datetime(2026, 10, 19, 6)
+
+
+def test_not_modified():
+    feed = FakeFeed(_rss(3), ETag='"v1"')
+    result = read_feed('https://news.example/rss', etag='"v1"', modified='Mon, 19 Oct 2026 00:00:00 GMT', session=feed)
+    assert (result.status, result.entries, result.etag) == (304, [], '"v1"')
+    assert feed.sent == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 19 Oct 2026 00:00:00 GMT'}
+
+
+def test_gzip_is_decoded():
+    result = read_feed('https://news.example/rss', session=FakeFeed(_rss(5), gzipped=True))
+    assert len(result.entries) == 5
+    assert result.bytes_read == len(_rss(5))
+
+
+def test_declared_length_over_the_cap_is_refused():
+    # The body itself is under the cap: only the header can trip it
+    feed = FakeFeed(_rss(3), **{'Content-Length': str(10 ** 9)})
+    with pytest.raises(FeedTooLarge):
+        read_feed('https://news.example/rss', max_bytes=4096, session=feed)
+
+
+def test_cap_applies_to_streamed_bytes():
+    with pytest.raises(FeedTooLarge):
+        read_feed('https://news.example/rss', max_bytes=1024, session=FakeFeed(_rss(200)))
+
+
+def test_cap_applies_to_decoded_gzip():
+    body = _rss(2000)
+    feed = FakeFeed(body, gzipped=True)
+    assert len(feed.body) < 64 * 1024 < len(body)
+    with pytest.raises(FeedTooLarge):
+        read_feed('https://news.example/rss', max_bytes=64 * 1024, max_entries=10 ** 6, session=feed)
+
+
+def test_stops_downloading_at_max_entries():
+    feed = FakeFeed(_rss(2000))
+    result = read_feed('https://news.example/rss', max_entries=5, session=feed)
+    assert result.truncated
+    assert [e.title for e in result.entries] == [f'Story {i}' for i in range(5)]
+    assert result.bytes_read < len(feed.body) // 10
+
+
+def test_malformed_xml_falls_back_to_feedparser():
+    pytest.importorskip('feedparser')
+    body = _rss(3).replace(b'<title>Story 1</title>', b'<title>Story 1 & more</title>')
+    result = read_feed('https://news.example/rss', session=FakeFeed(body))
+    assert [e.title for e in result.entries] == ['Story 0', 'Story 1 & more', 'Story 2']
+
+
+def test_malformed_xml_after_the_first_entries_keeps_them():
+    body = _rss(400).replace(b'<title>Story 300</title>', b'<title>Story 300 & more</title>')
+    result = read_feed('https://news.example/rss', max_entries=1000, session=FakeFeed(body))
+    assert len(result.entries) == 300
+
+
+def test_unreadable_feed_raises():
+    pytest.importorskip('feedparser')
+    with pytest.raises(Exception):
+        read_feed('https://news.example/rss', session=FakeFeed(b'\x00not a feed at all <<<'))
+
+
+def test_http_errors_raise():
+    with pytest.raises(requests.HTTPError):
+        read_feed('https://news.example/rss', session=FakeFeed(b'gone', status=410))
@@ -0,0 +1,110 @@
+import io
+from email.utils import formatdate
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
+from config import Config
+from scripts.http_cache import HttpCache, freshness_lifetime
+
+NOW = 1_800_000_000.0
+
+
+def _date(offset):
+    return formatdate(NOW + offset, usegmt=True)
+
+
+@pytest.mark.parametrize('headers, lifetime', [
+    ({'Cache-Control': 'public, max-age=600'}, 600),
+    ({'Cache-Control': 'max-age="60"'}, 60),
+    ({'Cache-Control': 'max-age=bogus'}, 0),
+    ({'Cache-Control': 'no-cache, max-age=600'}, 0),
+    ({'Cache-Control': 'no-store'}, None),
+    ({'Vary': '*'}, None),
+    ({'Date': _date(0), 'Expires': _date(300)}, 300),
+    ({'Date': _date(0), 'Expires': _date(-300)}, 0),
+    ({'Expires': '0'}, 0),
+    # 10% of the time since Last-Modified
+    ({'Date': _date(0), 'Last-Modified': _date(-1000)}, 100),
+])
+def test_freshness_lifetime(headers, lifetime):
+    assert freshness_lifetime(headers, now=NOW) == lifetime
+
+
+def test_freshness_defaults():
+    assert freshness_lifetime({}, now=NOW) == Config.HTTP_CACHE_DEFAULT_TTL
+    ancient = {'Date': _date(0), 'Last-Modified': _date(-10 ** 9)}
+    assert freshness_lifetime(ancient, now=NOW) == Config.HTTP_CACHE_DEFAULT_TTL
+
+
+class Origin:
+    """Stands in for the network: serves `body` with `headers`, 304s matching validators."""
+
+    def __init__(self, body, **headers):
+        self.body = body
+        self.headers = headers
+        self.sent = []
+
+    def __call__(self, extra):
+        self.sent.append(extra)
+        resp = requests.Response()
+        resp.url = 'https://news.example/a'
+        etag = self.headers.get('ETag')
+        if etag and extra.get('If-None-Match') == etag:
+            resp.status_code = 304
+            resp.headers = CaseInsensitiveDict({'ETag': etag})
+            resp.raw = HTTPResponse(body=io.BytesIO(b''), preload_content=False)
+        else:
+            resp.status_code = 200
+            resp.headers = CaseInsensitiveDict(self.headers)
+            resp.raw = HTTPResponse(body=io.BytesIO(self.body), preload_content=False)
+        return resp
+
+
+@pytest.fixture
+def http_cache(config):
+    return HttpCache(max_bytes=1024 * 1024)
+
+
+def test_fresh_entries_are_served_from_disk(http_cache):
+    origin = Origin(b'<html>story</html>', **{'Cache-Control': 'max-age=600', 'Content-Type': 'text/html'})
+    url = 'https://news.example/a'
+    assert http_cache.fetch(url, origin).content == b'<html>story</html>'
+    cached = http_cache.fetch(url, origin)
+    assert cached.content == b'<html>story</html>'
+    assert cached.headers['X-Cache'] == 'HIT'
+    assert len(origin.sent) == 1
+
+
+def test_stale_entries_are_revalidated(http_cache):
+    origin = Origin(b'image bytes', **{'Cache-Control': 'no-cache', 'ETag': '"v1"'})
+    url = 'https://news.example/a'
+    http_cache.fetch(url, origin)
+    resp = http_cache.fetch(url, origin)
+    assert resp.headers['X-Cache'] == 'HIT' and resp.content == b'image bytes'
+    assert origin.sent == [{}, {'If-None-Match': '"v1"'}]
+
+
+def test_no_store_responses_are_not_kept(http_cache):
+    origin = Origin(b'private', **{'Cache-Control': 'no-store'})
+    for _ in range(2):
+        assert http_cache.fetch('https://news.example/a', origin).content == b'private'
+    assert len(origin.sent) == 2
+
+
+def test_replacing_an_entry_does_not_count_its_size_twice(http_cache):
+    url = 'https://news.example/a'
+    http_cache.fetch(url, Origin(b'x' * 100, **{'Cache-Control': 'no-cache'}))
+    for _ in range(3):
+        http_cache.fetch(url, Origin(b'y' * 100, **{'Cache-Control': 'no-cache'}))
+    assert http_cache._size == http_cache._disk_usage()[0] == 100
+
+
+def test_least_recently_used_entries_are_evicted(config):
+    http_cache = HttpCache(max_bytes=250)
+    for name in ('a', 'b', 'c'):
+        http_cache.fetch(f'https://news.example/{name}', Origin(b'z' * 100))
+    kept = {meta['url'] for meta in filter(None, (http_cache._load(f'https://news.example/{n}') for n in 'abc'))}
+    assert kept == {'https://news.example/b', 'https://news.example/c'}
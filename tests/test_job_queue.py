@@ -0,0 +1,147 @@
+from datetime import datetime
+
+import pytest
+
+import scripts.job_queue as job_queue
+from app import db
+from app.models import Job
+from scripts.job_queue import (
+    _claimable, _lease, batch_results, claim, complete, enqueue, fail, new_batch, wait_for_batch,
+)
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Replace the pipeline's job handlers with the ones a test puts in the dict."""
+    registry = {}
+    monkeypatch.setattr(job_queue, '_handlers', lambda: registry)
+    return registry
+
+
+def test_a_claimed_job_is_hidden_from_other_workers(app):
+    job_id = enqueue('fetch', {'feed_urls': []}).id
+    claimed = claim('worker-a')
+    assert claimed.id == job_id and claimed.owner == 'worker-a' and claimed.attempts == 1
+    assert claim('worker-b') is None
+
+
+def test_claim_is_a_compare_and_set(app):
+    job_id = enqueue('fetch', {}).id
+    now = datetime.utcnow()
+    # Both workers saw the job as claimable; only the first conditional UPDATE matches it
+    first = Job.query.filter(Job.id == job_id, _claimable(now)).update(_lease(now, 'worker-a'), synchronize_session=False)
+    second = Job.query.filter(Job.id == job_id, _claimable(now)).update(_lease(now, 'worker-b'), synchronize_session=False)
+    assert (first, second) == (1, 0)
+
+
+def test_a_lapsed_lease_is_taken_over_and_guards_the_result(app, config, monkeypatch):
+    monkeypatch.setattr(config, 'JOB_VISIBILITY_TIMEOUT', -1)  # every lease lapses at once
+    job_id = enqueue('fetch', {}).id
+    stale = claim('worker-a')
+    fresh = claim('worker-b')
+    assert fresh.id == job_id and fresh.attempts == 2
+
+    # The worker that lost its lease can't finish the job...
+    assert complete(stale, {'from': 'a'}) is False
+    # ...but the one holding it can
+    assert complete(fresh, {'from': 'b'}) is True
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.result, job.lease_owner) == ('done', {'from': 'b'}, None)
+
+
+def test_a_job_whose_lease_always_lapses_fails(app, config, monkeypatch):
+    monkeypatch.setattr(config, 'JOB_VISIBILITY_TIMEOUT', -1)
+    job_id = enqueue('fetch', {}, max_attempts=1).id
+    assert claim('worker-a').id == job_id
+    assert claim('worker-b') is None
+    assert db.session.get(Job, job_id).status == 'failed'
+
+
+def test_failures_retry_with_backoff_then_give_up(app):
+    job_id = enqueue('fetch', {}, max_attempts=2).id
+    fail(claim('worker-a'), RuntimeError('boom'))
+    job = db.session.get(Job, job_id)
+    assert job.status == 'queued' and job.available_at > datetime.utcnow()
+    assert claim('worker-a') is None  # backing off
+
+    Job.query.filter(Job.id == job_id).update({'available_at': datetime.utcnow()})
+    fail(claim('worker-a'), RuntimeError('boom again'))
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.error) == ('failed', 'boom again')
+
+
+def test_wait_for_batch_works_its_own_jobs(app, handlers):
+    handlers['fetch'] = lambda job: {'new_entries': job.payload['n']}
+    batch = new_batch()
+    for n in range(3):
+        enqueue('fetch', {'n': n}, batch=batch)
+    enqueue('fetch', {'n': 99})  # another run's job is left alone
+
+    assert wait_for_batch(batch, timeout=5)
+    assert sorted(r['new_entries'] for _, r in batch_results(batch, 'fetch')) == [0, 1, 2]
+    assert Job.query.filter_by(batch=None).one().status == 'queued'
+
+
+def test_counters_of_jobs_worked_outside_a_run_come_back_with_the_result(app, handlers):
+    from app import metrics
+
+    def scrape(job):
+        metrics.incr('http_cache_hits')
+        return {'image_url': None}
+
+    handlers['scrape'] = scrape
+    enqueue('scrape', {'link': 'https://news.example/a'})
+    assert job_queue.work_one('worker-a')
+    assert Job.query.one().result == {'image_url': None, 'counters': {'http_cache_hits': 1}}
+
+
+def test_jobs_worked_by_the_run_count_in_the_run_directly(app, handlers):
+    from app import metrics
+
+    def scrape(job):
+        metrics.incr('http_cache_hits')
+        return {'image_url': None}
+
+    handlers['scrape'] = scrape
+    enqueue('scrape', {'link': 'https://news.example/a'})
+    with metrics.pipeline_run() as recorder:
+        assert job_queue.work_one('worker-a')
+        metrics.add_to_run({'http_cache_hits': 2})  # as reported by another worker's job
+    assert Job.query.one().result == {'image_url': None}
+    assert recorder.counters['http_cache_hits'] == 3
+
+
+def test_a_slow_job_keeps_its_lease(app, config, monkeypatch, handlers):
+    import time
+
+    monkeypatch.setattr(config, 'JOB_VISIBILITY_TIMEOUT', 0.3)
+    taken_over = []
+
+    def slow_fetch(job):
+        # Outlives the lease several times over; the heartbeat keeps renewing it
+        for _ in range(4):
+            time.sleep(0.25)
+            taken_over.append(claim('worker-b'))
+        return {'new_entries': 0}
+
+    handlers['fetch'] = slow_fetch
+    job_id = enqueue('fetch', {}).id
+    assert job_queue.work_one('worker-a')
+
+    assert taken_over == [None] * 4
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('done', 1)
+
+
+def test_claim_skips_any_number_of_dead_jobs(app):
+    expired = datetime(2000, 1, 1)
+    db.session.add_all(
+        Job(kind='fetch', status='running', attempts=1, max_attempts=1,
+            lease_owner='gone', lease_expires_at=expired, available_at=expired)
+        for _ in range(1100)
+    )
+    db.session.commit()
+    job_id = enqueue('fetch', {}).id
+
+    assert claim('worker-a').id == job_id
+    assert Job.query.filter_by(status='failed').count() == 1100
@@ -0,0 +1,32 @@
+from app import metrics
+
+
+def test_metrics_need_a_login_when_no_token_is_set(client):
+    assert client.get('/metrics').status_code == 401
+
+
+def test_metrics_accept_the_configured_token(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape-me'
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'})
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+
+
+def test_logged_in_users_can_read_metrics(logged_in):
+    metrics.reset()
+    metrics.incr('feed_errors', feed='https://news.example/rss')
+    body = logged_in.get('/metrics').get_data(as_text=True)
+    assert 'newsagg_events_total{event="feed_errors",feed="https://news.example/rss"} 1' in body
+
+
+def test_status_reports_the_latest_run_despite_caching(logged_in):
+    assert logged_in.get('/api/status').get_json()['last_run'] is None
+
+    with metrics.pipeline_run():
+        pass
+
+    run = logged_in.get('/api/status').get_json()['last_run']
+    assert run['id'] is not None
+    assert run['status'] == 'success'
+    assert run['finished_at'] is not None
@@ -0,0 +1,64 @@
+import pytest
+
+import scripts.news_scraper as news_scraper
+from app.models import NewsItem, SocialMediaScript, UnifiedScript
+from benchmarks.stubs import FakeGemini, StubServer, StubSettings
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(StubSettings(entries_per_feed=10, article_kb=5, image_px=200)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(news_scraper, 'genai', fake)
+    return fake
+
+
+@pytest.mark.parametrize('job_queue', [False, True])
+def test_a_second_run_in_the_same_week_keeps_the_digest(app, config, monkeypatch, stub, gemini, job_queue):
+    monkeypatch.setattr(config, 'RSS_FEEDS', stub.feed_urls(5))
+    monkeypatch.setattr(config, 'FEED_POLL_DELAY', 0)
+    monkeypatch.setattr(config, 'JOB_QUEUE_ENABLED', job_queue)
+    monkeypatch.setattr(config, 'JOB_POLL_INTERVAL', 0.01)
+
+    first = news_scraper.run_news_pipeline()
+    assert len(first) == 10
+    assert gemini.calls == 2
+
+    second = news_scraper.run_news_pipeline()
+    # Same stories, as stored by the first run; no new Gemini calls or rows
+    assert [n['link'] for n in second] == [n['link'] for n in first]
+    assert [n['image_path'] for n in second] == [n['image_path'] for n in first]
+    assert all(n['script'] == first[0]['script'] for n in second)
+    assert gemini.calls == 2
+    assert NewsItem.query.count() == 10
+    assert SocialMediaScript.query.count() == 10
+    assert UnifiedScript.query.count() == 1
+
+
+def test_new_stories_replace_the_weeks_unified_script(app, config, monkeypatch, stub, gemini):
+    from app import db
+
+    monkeypatch.setattr(config, 'RSS_FEEDS', stub.feed_urls(5))
+    monkeypatch.setattr(config, 'FEED_POLL_DELAY', 0)
+    first = news_scraper.run_news_pipeline()
+    week_start = UnifiedScript.query.one().week_start
+
+    # One story is new to the second run, and an older run left a duplicate script row
+    item = NewsItem.query.filter_by(link=first[0]['link']).one()
+    SocialMediaScript.query.filter_by(news_item_id=item.id).delete()
+    db.session.delete(item)
+    db.session.add(UnifiedScript(content='stale', week_start=week_start))
+    db.session.commit()
+
+    second = news_scraper.run_news_pipeline()
+    assert len(second) == 10
+    assert gemini.calls == 4
+    assert NewsItem.query.count() == 10
+    unified = UnifiedScript.query.one()
+    assert unified.content != 'stale' and second[0]['script'] == unified.content
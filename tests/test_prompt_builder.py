@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from scripts.prompt_builder import clean_summary, estimate_tokens, pack_stories, truncate_text
+
+
+def _story(n, summary='A sentence about the story. ' * 20):
+    return SimpleNamespace(title=f'Story {n}', link=f'https://news.example/{n}', summary=summary)
+
+
+def test_clean_summary_keeps_only_visible_text():
+    html = ('<p>Schools reopen. <img src="x.jpg"></p><script>track()</script>'
+            '<p>Details inside. https://news.example/a</p><p>Schools reopen.</p>')
+    assert clean_summary(html) == 'Schools reopen. Details inside.'
+
+
+def test_truncate_prefers_sentence_then_word_boundaries():
+    assert truncate_text('One two. Three four five six.', 14) == 'One two.'
+    assert truncate_text('alpha beta gamma delta', 15) == 'alpha beta…'
+    assert truncate_text('short', 15) == 'short'
+
+
+def test_pack_stories_keeps_the_top_stories_within_budget():
+    stories = [_story(n) for n in range(20)]
+    text, stats = pack_stories(stories, budget=300, story_tokens=40)
+    assert stats['tokens'] <= 300
+    assert stats['stories'] + stats['dropped'] == 20
+    assert 0 < stats['stories'] < 20
+    # Ranked order is kept and only the tail is dropped
+    assert text.startswith('- Story 0 (https://news.example/0)')
+    assert f"Story {stats['stories'] - 1} " in text and f"Story {stats['stories']} " not in text
+
+
+def test_pack_stories_trims_each_summary():
+    text, stats = pack_stories([_story(0)], budget=1000, story_tokens=10)
+    assert stats == {'stories': 1, 'dropped': 0, 'tokens': estimate_tokens(text) + 1}
+    assert len(text.split('\n', 1)[1]) <= 10 * 4 + 1
+
+
+def test_pack_stories_always_includes_the_top_story():
+    text, stats = pack_stories([_story(0), _story(1)], budget=5, story_tokens=80)
+    assert stats['stories'] == 1 and stats['dropped'] == 1
+    assert estimate_tokens(text) <= 5
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+import pytest
+
+from app import db
+from app.models import NewsItem
+from scripts.retention import delete_orphaned_images
+
+
+def _write(folder, name, data):
+    with open(os.path.join(folder, name), 'wb') as fh:
+        fh.write(data)
+    return name
+
+
+def _hashed(folder, data, ext='.jpg'):
+    return _write(folder, hashlib.sha256(data).hexdigest()[:32] + ext, data)
+
+
+@pytest.fixture
+def images(app, config, monkeypatch):
+    monkeypatch.setattr(config, 'RETENTION_IMAGE_GRACE_SECONDS', -1)
+    os.makedirs(config.UPLOAD_FOLDER)
+    return config.UPLOAD_FOLDER
+
+
+def test_only_unreferenced_pipeline_images_are_deleted(images):
+    kept = _hashed(images, b'still in use')
+    kept_variant = _write(images, kept[:-4] + '_480w.webp', b'v')
+    orphan = _hashed(images, b'archived story')
+    orphan_variant = _write(images, orphan[:-4] + '_480w.webp', b'v')
+    db.session.add(NewsItem(title='t', link='https://news.example/a', image_path=kept,
+                            image_variants=[{'file': kept_variant, 'width': 480, 'format': 'webp'}]))
+    db.session.commit()
+
+    # Files the pipeline didn't write: bundled uuid-named images, thumbnails, anything else
+    bundled = _write(images, '1cc89365a46e455fa69531b86f69fc20.jpeg', b'bundled')
+    others = [bundled, _write(images, 'thumb_' + bundled, b't'), _write(images, 'logo.png', b'l')]
+
+    assert delete_orphaned_images() == 2
+    assert sorted(os.listdir(images)) == sorted([kept, kept_variant] + others)
+    assert orphan not in os.listdir(images) and orphan_variant not in os.listdir(images)
+
+
+def test_recent_images_are_kept(images, config, monkeypatch):
+    monkeypatch.setattr(config, 'RETENTION_IMAGE_GRACE_SECONDS', 3600)
+    _hashed(images, b'saved by a running pipeline')
+    assert delete_orphaned_images() == 0
@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask import template_rendered
+
+from app import db
+from app.models import NewsItem
+from app.routes import _current_week_start, _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    item = SimpleNamespace(created_at=datetime(2026, 10, 19, 8, 30, 15, 123456), id=42)
+    assert _decode_cursor(_encode_cursor(item)) == (item.created_at, 42)
+
+
+def test_cursor_is_url_safe_and_unpadded():
+    cursor = _encode_cursor(SimpleNamespace(created_at=datetime(2026, 1, 1), id=7))
+    assert '=' not in cursor
+    assert all(c.isalnum() or c in '-_' for c in cursor)
+
+
+@pytest.mark.parametrize('cursor', [
+    None,
+    '',
+    'not a cursor!',
+    base64.urlsafe_b64encode(b'no separator').decode(),
+    base64.urlsafe_b64encode(b'2026-01-01T00:00:00|abc').decode(),
+    base64.urlsafe_b64encode(b'yesterday|3').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+])
+def test_malformed_cursor_is_ignored(cursor):
+    assert _decode_cursor(cursor) is None
+
+
+@pytest.fixture
+def rendered(app):
+    """Context of every template rendered during the test, in order."""
+    contexts = []
+
+    def record(sender, template, context, **extra):
+        contexts.append(context)
+
+    template_rendered.connect(record, app)
+    yield contexts
+    template_rendered.disconnect(record, app)
+
+
+def _walk(client, rendered, path, items_of):
+    """Follow next_cursor from the first page to the last; returns the ids seen, in order."""
+    seen, cursor = [], None
+    while True:
+        assert client.get(path + (f'?cursor={cursor}' if cursor else '')).status_code == 200
+        context = rendered[-1]
+        seen.extend(item.id for item in items_of(context))
+        cursor = context['next_cursor']
+        if cursor is None:
+            return seen
+
+
+def _seed(*times):
+    items = [NewsItem(title=f'Story {n}', link=f'https://news.example/{n}', summary='Summary', created_at=at)
+             for n, at in enumerate(times)]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+def _newest_first(items):
+    return [item.id for item in sorted(items, key=lambda i: (i.created_at, i.id), reverse=True)]
+
+
+def test_home_pages_cover_the_week_exactly_once(app, logged_in, rendered):
+    app.config['NEWS_PAGE_SIZE'] = 3
+    week_start = _current_week_start()
+    step = (datetime.utcnow() - week_start) / 10
+    this_week = [week_start + step * n for n in range(8)]
+    # Ties on created_at are broken by id
+    items = _seed(*this_week, this_week[3], this_week[3], week_start - timedelta(microseconds=1))
+
+    seen = _walk(logged_in, rendered, '/', lambda context: context['news_items'])
+    assert seen == _newest_first(items[:-1])
+
+
+def test_dashboard_pages_and_week_counts_match_the_data(app, logged_in, rendered):
+    app.config['NEWS_PAGE_SIZE'] = 4
+    now = datetime.utcnow()
+    monday = _current_week_start()
+    times = [now - timedelta(hours=1)]
+    for weeks in range(1, 4):
+        start = monday - timedelta(weeks=weeks)
+        # Both sides of each week boundary, mid-week, and a tie
+        times += [start, start, start - timedelta(microseconds=1), start + timedelta(days=3, hours=12),
+                  start + timedelta(days=6, hours=23, minutes=59, seconds=59)]
+    items = _seed(*(at for at in times if at > now - timedelta(weeks=4) + timedelta(minutes=1)))
+
+    def page_items(context):
+        return [item for week in context['weekly_news'].values() for item in week]
+
+    seen = _walk(logged_in, rendered, '/dashboard', page_items)
+    assert seen == _newest_first(items)
+
+    expected = {}
+    for item in items:
+        week = (item.created_at.date() - timedelta(days=item.created_at.weekday())).isocalendar()[1]
+        expected[week] = expected.get(week, 0) + 1
+    assert rendered[-1]['week_counts'] == expected
+    # Each page groups its items under the week they fall in
+    for context in rendered:
+        for week, week_items in context['weekly_news'].items():
+            assert all(item.created_at.isocalendar()[1] == week for item in week_items)
@@ -0,0 +1,15 @@
+import scripts.telegram_bot as telegram_bot
+
+
+def test_digest_captions_escape_every_field(monkeypatch):
+    sent = []
+    monkeypatch.setattr(telegram_bot, 'send_telegram_message', lambda text, **kw: sent.append(text) or True)
+    telegram_bot.send_weekly_digest([{
+        'title': 'Fees <up> & more',
+        'summary': 'Costs rise 5% for a < b',
+        'link': 'https://news.example/a?x=1&y=<2>',
+    }])
+    caption = sent[-1]
+    assert '<b>Fees &lt;up&gt; &amp; more</b>' in caption
+    assert 'Costs rise 5% for a &lt; b' in caption
+    assert 'https://news.example/a?x=1&amp;y=&lt;2&gt;' in caption